@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Petr Iurin <p.yurin@gmail.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+from difflib import SequenceMatcher
+
+# Default maximum size of a unified diff, in characters
+DEFAULT_MAX_DIFF_SIZE = 64 * 1024
+
+DIFF_FORMATS = ['full', 'unified']
+
+
+def make_diff(before, after, path, diff_format='full', max_size=DEFAULT_MAX_DIFF_SIZE):
+    """Build the diff dict a module returns for a changed file.
+
+    'full' returns both contents, 'unified' only a unified diff of them (as 'prepared',
+    which Ansible shows as is), computed on the managed host and at most max_size long.
+    """
+    if diff_format == 'unified':
+        return {'prepared': unified_diff(before, after, path, max_size=max_size)}
+    return {'before': before, 'after': after}
+
+
+def unified_diff(before, after, path='', context=3, max_size=DEFAULT_MAX_DIFF_SIZE):
+    """Return the unified diff of two texts, in the format of difflib.unified_diff joined.
+
+    Lines shared by the start and the end of both texts are skipped before the lines are
+    matched, so a few changes in a big file cost about one pass over it.  Each hunk still
+    gets context lines around it, but where repeated lines make the change ambiguous it
+    may be placed differently than difflib would.  A diff longer than max_size characters
+    (None for no limit) is cut at a line end and marked as such.
+    """
+    a = before.splitlines(True)
+    b = after.splitlines(True)
+
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    if prefix == len(a) == len(b):
+        return ''
+
+    lines = [f'--- {path}\n', f'+++ {path}\n']
+    size = len(lines[0]) + len(lines[1])
+    for group in _group_opcodes(_opcodes(a, b, prefix, suffix), context):
+        hunk = [f'@@ -{_format_range(group[0][1], group[-1][2])} '
+                f'+{_format_range(group[0][3], group[-1][4])} @@\n']
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                hunk.extend(_diff_line(' ', line) for line in a[i1:i2])
+                continue
+            if tag in ('replace', 'delete'):
+                hunk.extend(_diff_line('-', line) for line in a[i1:i2])
+            if tag in ('replace', 'insert'):
+                hunk.extend(_diff_line('+', line) for line in b[j1:j2])
+        for line in hunk:
+            size += len(line)
+            if max_size is not None and size > max_size:
+                lines.append(f'[diff truncated at {max_size} characters]\n')
+                return ''.join(lines)
+            lines.append(line)
+    return ''.join(lines)
+
+
+def _opcodes(a, b, prefix, suffix):
+    """Return the opcodes of a to b, matching only the lines between the shared prefix and suffix."""
+    matcher = SequenceMatcher(None, a[prefix:len(a) - suffix], b[prefix:len(b) - suffix])
+    codes = [(tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix)
+             for tag, i1, i2, j1, j2 in matcher.get_opcodes()]
+    if prefix:
+        if codes and codes[0][0] == 'equal':
+            codes[0] = ('equal', 0, codes[0][2], 0, codes[0][4])
+        else:
+            codes.insert(0, ('equal', 0, prefix, 0, prefix))
+    if suffix:
+        if codes and codes[-1][0] == 'equal':
+            codes[-1] = ('equal', codes[-1][1], len(a), codes[-1][3], len(b))
+        else:
+            codes.append(('equal', len(a) - suffix, len(a), len(b) - suffix, len(b)))
+    return codes
+
+
+def _group_opcodes(codes, context):
+    """Group opcodes into hunks with context lines, like SequenceMatcher.get_grouped_opcodes."""
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A long run of equal lines ends a hunk and starts the next one
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _format_range(start, stop):
+    """Format the line range of a hunk header the way difflib does."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def _diff_line(tag, line):
+    if line.endswith('\n'):
+        return tag + line
+    return tag + line + '\n\\ No newline at end of file\n'
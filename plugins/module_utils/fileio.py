@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Petr Iurin <p.yurin@gmail.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os, mmap, locale, tempfile
+
+# Files at least this big are read through mmap
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def read_text(path):
+    """Read a text file the way open(path).read() does, large files through mmap.
+
+    Large files are decoded straight from the mapped pages, so no bytes copy of the
+    whole file is built before decoding.  Files containing '\\r' are read the regular
+    way, which translates their newlines.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped.find(b'\r') == -1:
+                    return str(mapped, locale.getpreferredencoding(False))
+    with open(path, 'r') as f:
+        return f.read()
+
+
+def make_temp_file(path):
+    """Create a temporary file in the directory of path, return (fd, temp_path).
+
+    Being on the same filesystem, it can be renamed over path atomically.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    return tempfile.mkstemp(dir=directory, prefix=f'.{name}.', suffix='.tmp')
+
+
+class CompareWriter:
+    """Text sink telling if what is written to it differs from the content of path.
+
+    The written text is compared with the file as it arrives and is not kept, so a
+    streamed edit can be checked without writing anything (e.g. in check mode).  Like
+    filecmp on a file written in text mode, newlines are compared untranslated.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'r', newline='')
+        self.differs = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, text):
+        if not self.differs and self._file.read(len(text)) != text:
+            self.differs = True
+        return len(text)
+
+    def close(self):
+        """Finish the comparison, content left in the file makes it differ."""
+        if self._file.closed:
+            return
+        try:
+            if not self.differs and self._file.read(1):
+                self.differs = True
+        finally:
+            self._file.close()
+
+
+def replace_file(module, temp_path, path, fsync=False):
+    """Move temp_path over path, keeping the owner, mode and SELinux context of path.
+
+    With fsync the data of temp_path is flushed to disk first.  The rename itself is
+    made durable by fsync_dirs, called once for all the files of a run.
+    """
+    try:
+        if fsync:
+            fd = os.open(temp_path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        module.atomic_move(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_atomic(module, path, content, fsync=False):
+    """Replace path with content, readers see either the old or the new file, never a partial one."""
+    temp_fd, temp_path = make_temp_file(path)
+    try:
+        with os.fdopen(temp_fd, 'w') as f:
+            f.write(content)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    replace_file(module, temp_path, path, fsync)
+
+
+def fsync_dirs(paths):
+    """fsync the directories of paths, once per directory, to make renames in them durable."""
+    for directory in sorted({os.path.dirname(os.path.abspath(path)) for path in paths}):
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright: (c) 2025, Petr Iurin <p.yurin@gmail.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Cache of edits known to change nothing in a file, kept across module runs.
+
+For every edited file the cache directory holds a small JSON file with the state of the
+file (inode, mtime, size and sha256 of its content) and the digests of the operations
+that were found to leave it as it is.  A rerun of one of them on the same file state is
+answered after a stat and a hash, without parsing the file.  Only no-op results are
+recorded: a file that was changed has a new state anyway.
+"""
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os, json, hashlib, tempfile
+
+# Bump when a change of the edit functions can change the result of the same operations
+CACHE_VERSION = 1
+
+# Maximum number of operation digests kept for a file state
+MAX_CACHED_OPERATIONS = 32
+
+
+def operation_digest(name, **params):
+    """Return a digest of the module name and the parameters that define its operations."""
+    payload = json.dumps([CACHE_VERSION, name, params], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_state(path):
+    """Return the state of path the cache is keyed on, the stat is taken before hashing."""
+    stat = os.stat(path)
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return dict(inode=stat.st_ino, mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=sha256.hexdigest())
+
+
+def is_known_noop(cache_dir, path, digest):
+    """Check if the operations with digest were recorded as changing nothing in path as it is now."""
+    entry = _load_entry(cache_dir, path)
+    if entry is None:
+        return False
+    # A different stat means a different file, no need to hash it
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if (entry.get('inode'), entry.get('mtime_ns'), entry.get('size')) != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        return False
+    if digest not in entry.get('operations', ()):
+        return False
+    return _state_of(entry) == file_state(path)
+
+
+def record_noop(cache_dir, path, state, digest):
+    """Record that the operations with digest changed nothing in path.
+
+    state is the file_state of path taken before it was read, nothing is recorded if the
+    file has changed since.  Errors are ignored, the cache is only an optimization.
+    """
+    try:
+        if file_state(path) != state:
+            return
+        entry = _load_entry(cache_dir, path)
+        if entry is None or _state_of(entry) != state:
+            entry = dict(state, path=os.path.abspath(path), operations=[])
+        operations = [d for d in entry['operations'] if d != digest] + [digest]
+        entry['operations'] = operations[-MAX_CACHED_OPERATIONS:]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        entry_path = _entry_path(cache_dir, path)
+        temp_fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(temp_fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    except (OSError, ValueError):
+        pass
+
+
+def _entry_path(cache_dir, path):
+    name = hashlib.sha256(os.path.abspath(path).encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(cache_dir, f'{name}.json')
+
+
+def _load_entry(cache_dir, path):
+    """Return the cache entry of path, None if there is none or it can't be read."""
+    try:
+        with open(_entry_path(cache_dir, path)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get('path') != os.path.abspath(path):
+        return None
+    return entry
+
+
+def _state_of(entry):
+    return dict(inode=entry.get('inode'), mtime_ns=entry.get('mtime_ns'), size=entry.get('size'),
+                sha256=entry.get('sha256'))
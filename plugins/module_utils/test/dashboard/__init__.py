@@ -0,0 +1 @@
+# File IO tests
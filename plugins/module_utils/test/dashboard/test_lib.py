@@ -0,0 +1,347 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Tests for the Wazuh Dashboard API client"""
+
+import unittest
+import json
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+# Add wazuh directory to path to import the dashboard package
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'wazuh'))
+
+import requests
+from requests.adapters import BaseAdapter
+from dashboard import api
+from dashboard.api import DashboardClient, get_client
+from dashboard.create_saved_search import (create_saved_search, create_saved_searches, build_saved_search_object,
+                                           is_saved_search_unchanged, saved_search_id, upsert_saved_searches)
+
+
+class FakeDashboard(BaseAdapter):
+    """Transport adapter answering the saved objects API from a dict, instead of a real dashboard."""
+
+    types = ('search', 'visualization', 'dashboard', 'index-pattern')
+
+    def __init__(self):
+        super().__init__()
+        self.objects = {}
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        url = urlsplit(request.url)
+        parts = url.path.strip('/').split('/')
+        body = json.loads(request.body) if request.body else None
+        status, data = 404, {'message': 'Not Found'}
+        if parts == ['']:
+            status, data = 200, {}
+        if parts[:2] == ['api', 'saved_objects']:
+            if parts[2:] == ['_bulk_create']:
+                overwrite = parse_qs(url.query).get('overwrite') == ['true']
+                status, data = 200, {'saved_objects': [
+                    self.create(o['type'], o['attributes'], o.get('id')) if overwrite or o.get('id') not in self.objects
+                    else dict(id=o['id'], type=o['type'], error={'statusCode': 409, 'message': 'Conflict'}) for o in body]}
+            elif parts[2:] == ['_bulk_get']:
+                status, data = 200, {'saved_objects': [self.objects.get(o['id'], dict(
+                    id=o['id'], type=o['type'], error={'statusCode': 404, 'message': 'Not found'})) for o in body]}
+            elif parts[2:] == ['_bulk_update']:
+                status, data = 200, {'saved_objects': [self.update(o['id'], o['attributes']) for o in body]}
+            elif parts[2:] == ['_find'] and parse_qs(url.query)['type'][0] not in self.types:
+                status, data = 400, {'message': 'Unsupported saved object type'}
+            elif parts[2:] == ['_find']:
+                params = parse_qs(url.query)
+                found = [o for o in self.objects.values() if o['type'] == params['type'][0]
+                         and params.get('search', [''])[0] in o['attributes'].get('title', '')]
+                page, per_page = int(params.get('page', ['1'])[0]), int(params.get('per_page', ['20'])[0])
+                page_objects = found[(page - 1) * per_page:page * per_page]
+                if 'fields' in params:
+                    page_objects = [dict(o, attributes={k: v for k, v in o['attributes'].items() if k in params['fields']})
+                                    for o in page_objects]
+                status, data = 200, {'saved_objects': page_objects, 'total': len(found), 'page': page, 'per_page': per_page}
+            elif len(parts) == 3 and request.method == 'POST':
+                status, data = 200, self.create(parts[2], body['attributes'])
+            elif len(parts) == 4 and parts[3] in self.objects:
+                if request.method == 'PUT':
+                    status, data = 200, self.update(parts[3], body['attributes'])
+                elif request.method == 'GET':
+                    status, data = 200, self.objects[parts[3]]
+                elif request.method == 'DELETE':
+                    del self.objects[parts[3]]
+                    status, data = 200, {}
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(data).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def create(self, object_type, attributes, object_id=None):
+        object_id = object_id or f'id-{len(self.requests)}-{len(self.objects) + 1}'
+        self.objects[object_id] = dict(id=object_id, type=object_type, attributes=attributes)
+        return self.objects[object_id]
+
+    def update(self, object_id, attributes):
+        if object_id not in self.objects:
+            return dict(id=object_id, error={'statusCode': 404, 'message': 'Not found'})
+        self.objects[object_id]['attributes'].update(attributes)
+        return self.objects[object_id]
+
+    def close(self):
+        pass
+
+
+class TestDashboardClient(unittest.TestCase):
+
+    def setUp(self):
+        self.dashboard = FakeDashboard()
+        self.client = DashboardClient('dashboard.local', 'admin', 'secret', port=8443)
+        self.client.session.mount('https://', self.dashboard)
+
+    def tearDown(self):
+        self.client.close()
+        api._clients.clear()
+
+    def test_saved_object_lifecycle(self):
+        """Objects can be created, found, read, updated and deleted"""
+        success, created, error = self.client.create_saved_object('search', {'attributes': {'title': 'Mac mini Logs'}})
+        self.assertTrue(success, error)
+        object_id = created['id']
+
+        success, found, error = self.client.find_saved_objects('search', 'Mac mini')
+        self.assertEqual([o['id'] for o in found], [object_id])
+
+        self.assertTrue(self.client.update_saved_object('search', object_id, {'attributes': {'description': 'd'}})[0])
+        success, fetched, error = self.client.get_saved_object('search', object_id)
+        self.assertEqual(fetched['attributes'], {'title': 'Mac mini Logs', 'description': 'd'})
+
+        self.assertTrue(self.client.delete_saved_object('search', object_id)[0])
+        success, fetched, error = self.client.get_saved_object('search', object_id)
+        self.assertFalse(success)
+        self.assertIn('Status code: 404', error)
+
+    def test_auth_and_headers_are_set_once(self):
+        """Every request of the client carries the auth and the OpenSearch headers"""
+        self.client.find_saved_objects('search')
+        self.client.get_saved_object('search', 'missing')
+        for request in self.dashboard.requests:
+            self.assertTrue(request.url.startswith('https://dashboard.local:8443/api/saved_objects/'))
+            self.assertEqual(request.headers['osd-xsrf'], 'true')
+            self.assertTrue(request.headers['Authorization'].startswith('Basic '))
+
+    def test_connection_error(self):
+        """Test that an unreachable dashboard gives an error message"""
+        client = DashboardClient('127.0.0.1', 'admin', 'secret', port=1)
+        success, data, error = client.find_saved_objects('search')
+        self.assertEqual((success, data), (False, None))
+        self.assertEqual(error, 'Could not connect to Wazuh Dashboard at https://127.0.0.1:1')
+
+    def test_functions_share_cached_client(self):
+        """The module level functions use one client per dashboard and credentials"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        self.assertIs(get_client('dashboard.local', 'admin', 'secret', 8443), client)
+        self.assertIsNot(get_client('dashboard.local', 'reader', 'secret', 8443), client)
+        client.session.mount('https://', self.dashboard)
+
+        success, created, error = api.create_saved_object('dashboard.local', 'search', {'attributes': {'title': 'A'}},
+                                                          'admin', 'secret', port=8443)
+        self.assertTrue(success, error)
+        success, found, error = api.find_saved_objects('dashboard.local', 'search', 'A', 'admin', 'secret', port=8443)
+        self.assertEqual([o['id'] for o in found], [created['id']])
+        self.assertEqual(len(self.dashboard.requests), 2)
+
+
+    def test_bulk_functions_send_chunks(self):
+        """Bulk functions send chunk_size objects per request and return every result in order"""
+        objects = [{'type': 'search', 'attributes': {'title': f'Search {i}'}} for i in range(25)]
+        success, created, error = self.client.bulk_create_saved_objects(objects, chunk_size=10)
+        self.assertTrue(success, error)
+        self.assertEqual([o['attributes']['title'] for o in created], [f'Search {i}' for i in range(25)])
+        self.assertEqual(len(self.dashboard.requests), 3)
+
+        ids = [{'type': 'search', 'id': o['id']} for o in created] + [{'type': 'search', 'id': 'missing'}]
+        success, fetched, error = self.client.bulk_get_saved_objects(ids, chunk_size=20)
+        self.assertEqual(len(self.dashboard.requests), 5)
+        self.assertEqual([o['id'] for o in fetched], [o['id'] for o in ids])
+        self.assertEqual(fetched[-1]['error']['statusCode'], 404)
+
+        updates = [{'type': 'search', 'id': o['id'], 'attributes': {'description': 'bulk'}} for o in created]
+        success, updated, error = self.client.bulk_update_saved_objects(updates)
+        self.assertEqual(len(self.dashboard.requests), 6)
+        self.assertTrue(all(o['attributes']['description'] == 'bulk' for o in self.dashboard.objects.values()))
+
+        self.assertEqual(self.client.bulk_get_saved_objects(ids, chunk_size=0)[0], False)
+
+    def test_create_saved_searches(self):
+        """Existing searches are updated and missing ones created, with one request for each"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        client.session.mount('https://', self.dashboard)
+        client.wait_ready = lambda: True
+        success, existing, error = client.create_saved_object('search', {'attributes': {'title': 'Mac mini Logs'}})
+
+        results = create_saved_searches('dashboard.local', 'admin', 'secret', [
+            {'title': 'Mac mini Logs', 'filter': 'agent.name:Mac-mini.local'},
+            {'title': 'Authentication Failures', 'description': 'All authentication failure events'},
+            {'title': 'Level 10', 'filter': 'rule.level:10'},
+        ], port=8443)
+
+        self.assertEqual([(r['title'], r['action']) for r in results], [
+            ('Mac mini Logs', 'updated'), ('Authentication Failures', 'created'), ('Level 10', 'created'),
+        ])
+        self.assertEqual(results[0]['id'], existing['id'])
+        for r in results:
+            self.assertEqual(self.dashboard.objects[r['id']]['attributes']['title'], r['title'])
+        self.assertIn('agent.name', self.dashboard.objects[existing['id']]['attributes']['kibanaSavedObjectMeta']['searchSourceJSON'])
+        # create, then find, bulk update and bulk create
+        self.assertEqual(len(self.dashboard.requests), 4)
+
+        # A rerun only writes the searches that differ
+        results = create_saved_searches('dashboard.local', 'admin', 'secret', [
+            {'title': 'Mac mini Logs', 'filter': 'agent.name:Mac-mini.local'},
+            {'title': 'Level 10', 'filter': 'rule.level:9'},
+        ], port=8443)
+        self.assertEqual([r['action'] for r in results], ['unchanged', 'updated'])
+        self.assertEqual(len(self.dashboard.requests), 6)
+
+    def test_create_saved_search(self):
+        """A saved search is looked up once and written only if it differs"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        client.session.mount('https://', self.dashboard)
+        client.wait_ready = lambda: True
+        args = ('dashboard.local', 'admin', 'secret', 'Mac mini Logs')
+
+        created = create_saved_search(*args, filter='agent.name:Mac-mini.local', port=8443)
+        self.assertEqual(created['action'], 'created')
+        self.assertEqual(self.dashboard.objects[created['id']]['attributes']['title'], 'Mac mini Logs')
+        self.assertEqual(len(self.dashboard.requests), 2)
+
+        unchanged = create_saved_search(*args, filter='agent.name:Mac-mini.local', port=8443)
+        self.assertEqual(unchanged, dict(title='Mac mini Logs', id=created['id'], action='unchanged'))
+        self.assertEqual(len(self.dashboard.requests), 3)
+
+        updated = create_saved_search(*args, filter='agent.name:Mac-mini.local', columns=['timestamp'], port=8443)
+        self.assertEqual((updated['id'], updated['action']), (created['id'], 'updated'))
+        self.assertEqual(self.dashboard.objects[created['id']]['attributes']['columns'], ['timestamp'])
+        self.assertEqual(len(self.dashboard.requests), 5)
+
+    def test_is_saved_search_unchanged_resolves_references(self):
+        """Index patterns moved to the references of a stored search still compare equal"""
+        built = build_saved_search_object('Level 10', filter='rule.level:10')
+        source = json.loads(built['attributes']['kibanaSavedObjectMeta']['searchSourceJSON'])
+        source['indexRefName'] = 'kibanaSavedObjectMeta.searchSourceJSON.index'
+        del source['index']
+        source['filter'][0]['meta']['indexRefName'] = 'kibanaSavedObjectMeta.searchSourceJSON.filter[0].meta.index'
+        del source['filter'][0]['meta']['index']
+        stored = dict(attributes=dict(built['attributes'], kibanaSavedObjectMeta={'searchSourceJSON': json.dumps(source)}),
+                      references=[
+                          {'name': 'kibanaSavedObjectMeta.searchSourceJSON.index', 'type': 'index-pattern', 'id': 'wazuh-alerts-*'},
+                          {'name': 'kibanaSavedObjectMeta.searchSourceJSON.filter[0].meta.index', 'type': 'index-pattern',
+                           'id': 'wazuh-alerts-*'},
+                      ])
+        self.assertTrue(is_saved_search_unchanged(stored, built))
+
+        stored['references'][1]['id'] = 'other-*'
+        self.assertFalse(is_saved_search_unchanged(stored, built))
+        self.assertFalse(is_saved_search_unchanged({'attributes': {'title': 'Level 10'}}, built))
+
+    def test_saved_search_id(self):
+        """Ids depend on the namespace and the title only"""
+        self.assertEqual(saved_search_id('Mac mini Logs'), saved_search_id('Mac mini Logs', ''))
+        self.assertNotEqual(saved_search_id('Mac mini Logs'), saved_search_id('Mac mini logs'))
+        self.assertNotEqual(saved_search_id('Mac mini Logs'), saved_search_id('Mac mini Logs', 'staging'))
+        self.assertEqual(saved_search_id('Mac mini Logs', 'staging'), '932edc77-bdec-5b1e-8e85-f9727b853075')
+
+    def test_upsert_saved_searches(self):
+        """Searches are read by id and only the missing or different ones are written"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        client.session.mount('https://', self.dashboard)
+        client.wait_ready = lambda: True
+        searches = [{'title': f'Search {i}', 'filter': f'rule.level:{i}'} for i in range(5)]
+
+        results = upsert_saved_searches('dashboard.local', 'admin', 'secret', searches, port=8443, chunk_size=3)
+        self.assertEqual([r['action'] for r in results], ['created'] * 5)
+        self.assertEqual([r['id'] for r in results], [saved_search_id(f'Search {i}') for i in range(5)])
+        self.assertEqual(sorted(self.dashboard.objects), sorted(r['id'] for r in results))
+        # two chunks of bulk get, then two of bulk create, and no _find
+        self.assertEqual(len(self.dashboard.requests), 4)
+
+        searches[1]['columns'] = ['timestamp']
+        results = upsert_saved_searches('dashboard.local', 'admin', 'secret', searches, port=8443, chunk_size=3)
+        self.assertEqual([r['action'] for r in results], ['unchanged', 'updated', 'unchanged', 'unchanged', 'unchanged'])
+        self.assertEqual(self.dashboard.objects[results[1]['id']]['attributes']['columns'], ['timestamp'])
+        self.assertEqual(len(self.dashboard.requests), 7)
+
+    def test_upsert_saved_searches_removes_duplicates(self):
+        """Other searches with a managed title are deleted, the rest are kept"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        client.session.mount('https://', self.dashboard)
+        client.wait_ready = lambda: True
+        old = [self.dashboard.create('search', {'title': 'Mac mini Logs'})['id'] for i in range(2)]
+        other = self.dashboard.create('search', {'title': 'Other'})['id']
+
+        results = upsert_saved_searches('dashboard.local', 'admin', 'secret', [{'title': 'Mac mini Logs'}],
+                                        port=8443, id_namespace='prod', remove_duplicates=True)
+        self.assertEqual(results, [dict(title='Mac mini Logs', id=saved_search_id('Mac mini Logs', 'prod'),
+                                        action='created', duplicates=old)])
+        self.assertEqual(sorted(self.dashboard.objects), sorted([other, results[0]['id']]))
+
+        results = upsert_saved_searches('dashboard.local', 'admin', 'secret', [{'title': 'Mac mini Logs'}],
+                                        port=8443, id_namespace='prod', remove_duplicates=True)
+        self.assertEqual((results[0]['action'], results[0]['duplicates']), ('unchanged', []))
+
+    def test_wait_dashboard_ready_uses_cached_client(self):
+        """wait_dashboard_ready goes through the connections of the client of get_client"""
+        client = get_client('dashboard.local', 'admin', 'secret', 8443)
+        client.session.mount('https://', self.dashboard)
+        self.assertTrue(api.wait_dashboard_ready('dashboard.local', 8443, 'admin', 'secret'))
+        self.assertEqual(len(self.dashboard.requests), 1)
+        self.assertEqual(list(api._clients.values()), [client])
+
+    def test_iter_saved_objects_pages_lazily(self):
+        """Objects are fetched one page per request, only as far as they are consumed"""
+        for i in range(250):
+            self.dashboard.create('search', {'title': f'Search {i}', 'columns': ['timestamp']})
+        self.dashboard.create('visualization', {'title': 'Search chart'})
+
+        titles = [o['attributes']['title'] for o in self.client.iter_saved_objects('search', per_page=100)]
+        self.assertEqual(titles, [f'Search {i}' for i in range(250)])
+        self.assertEqual(len(self.dashboard.requests), 3)
+
+        objects = self.client.iter_saved_objects('search', search_term='Search 1', fields=['title'], per_page=10)
+        self.assertEqual(next(objects)['attributes'], {'title': 'Search 1'})
+        self.assertEqual(len(self.dashboard.requests), 4)
+
+        success, found, error = self.client.find_saved_objects('search')
+        self.assertEqual(len(found), 250)
+
+    def test_find_saved_object_by_title_stops_at_match(self):
+        """The search for a title stops at the page of its first exact match"""
+        for i in range(30):
+            self.dashboard.create('search', {'title': f'Logs {i}', 'description': 'x'})
+        self.dashboard.create('search', {'title': 'Logs', 'description': 'x'})
+        iter_saved_objects = self.client.iter_saved_objects
+        self.client.iter_saved_objects = lambda *args, **kwargs: iter_saved_objects(*args, per_page=10, **kwargs)
+
+        success, found, error = self.client.find_saved_object_by_title('search', 'Logs 5', fields=['description'])
+        self.assertEqual(found['attributes'], {'title': 'Logs 5', 'description': 'x'})
+        self.assertEqual(len(self.dashboard.requests), 1)
+
+        success, found, error = self.client.find_saved_object_by_title('search', 'Logs')
+        self.assertEqual(found['attributes']['title'], 'Logs')
+        self.assertEqual(len(self.dashboard.requests), 5)
+
+        self.assertEqual(self.client.find_saved_object_by_title('search', 'Missing'), (True, None, None))
+
+    def test_find_error(self):
+        """Test that a failing page request gives an error"""
+        self.assertRaises(api.DashboardApiError, list, self.client.iter_saved_objects('missing'))
+        success, found, error = self.client.find_saved_objects('missing')
+        self.assertEqual((success, found), (False, None))
+        self.assertIn('Status code: 400', error)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Tests for diff helpers"""
+
+import unittest
+import difflib
+import sys
+from pathlib import Path
+
+# Add module_utils directory to path to import diff module
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from diff import make_diff, unified_diff
+
+
+class TestDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.before = ''.join(f'<localfile><location>/var/log/{i}.log</location></localfile>\n' for i in range(1000))
+        self.after = self.before.replace('/var/log/500.log', '/var/log/five.log').replace('/var/log/998.log\n', '')
+
+    def test_unified_diff_matches_difflib(self):
+        """An unambiguous change gives the diff difflib.unified_diff gives"""
+        expected = ''.join(difflib.unified_diff(
+            self.before.splitlines(True), self.after.splitlines(True), 'ossec.conf', 'ossec.conf'))
+        self.assertEqual(unified_diff(self.before, self.after, 'ossec.conf'), expected)
+
+    def test_hunks_have_full_context(self):
+        """A change among repeated lines still gets context lines on both sides"""
+        self.assertEqual(unified_diff('a\nb\nx\nx\nx\nx\nc\n', 'a\nb\nx\nx\nx\nx\nx\nc\n', 'f'), (
+            '--- f\n'
+            '+++ f\n'
+            '@@ -4,4 +4,5 @@\n'
+            ' x\n'
+            ' x\n'
+            ' x\n'
+            '+x\n'
+            ' c\n'
+        ))
+
+    def test_unchanged_content_has_empty_diff(self):
+        """Test that identical contents give an empty diff"""
+        self.assertEqual(unified_diff(self.before, self.before), '')
+
+    def test_missing_final_newline_is_marked(self):
+        """A last line without newline is marked like diff(1) does"""
+        self.assertEqual(unified_diff('a\nb\n', 'a\nc', 'f'), (
+            '--- f\n'
+            '+++ f\n'
+            '@@ -1,2 +1,2 @@\n'
+            ' a\n'
+            '-b\n'
+            '+c\n'
+            '\\ No newline at end of file\n'
+        ))
+
+    def test_unified_diff_is_truncated(self):
+        """A diff over max_size is cut at a line end"""
+        after = self.before.replace('.log', '.json')
+        result = unified_diff(self.before, after, 'ossec.conf', max_size=1000)
+        self.assertLessEqual(len(result), 1000 + len('[diff truncated at 1000 characters]\n'))
+        self.assertTrue(result.endswith('\n[diff truncated at 1000 characters]\n'))
+
+    def test_make_diff(self):
+        """make_diff returns both contents or only the unified diff"""
+        self.assertEqual(make_diff('a\n', 'b\n', 'f'), {'before': 'a\n', 'after': 'b\n'})
+        self.assertEqual(make_diff('a\n', 'b\n', 'f', 'unified'), {'prepared': '--- f\n+++ f\n@@ -1 +1 @@\n-a\n+b\n'})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
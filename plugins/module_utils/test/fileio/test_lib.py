@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Tests for fileio helpers"""
+
+import unittest
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add module_utils directory to path to import fileio module
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import fileio
+from fileio import read_text, write_atomic, fsync_dirs, CompareWriter
+
+
+class FakeModule:
+    """Stands in for AnsibleModule, whose atomic_move renames the file over the destination."""
+
+    def atomic_move(self, src, dest):
+        os.replace(src, dest)
+
+
+class TestFileIO(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'ossec.conf')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, content, newline=None):
+        with open(self.path, 'w', newline=newline) as f:
+            f.write(content)
+
+    def test_read_text_matches_regular_read(self):
+        """Small, mmap'd and CRLF files read the same as open().read()"""
+        for content, newline in (
+            ('<ossec_config/>\n', None),
+            ('<name>é</name>\n' * (fileio.MMAP_THRESHOLD // 10), None),
+            ('<name>é</name>\n' * (fileio.MMAP_THRESHOLD // 10), '\r\n'),
+            ('', None),
+        ):
+            with self.subTest(size=len(content), newline=newline):
+                self.write(content, newline)
+                with open(self.path, 'r') as f:
+                    expected = f.read()
+                self.assertEqual(read_text(self.path), expected)
+
+    def test_compare_writer(self):
+        """CompareWriter tells written text apart from the file content, without writing anything"""
+        self.write('<a>\r\n  <b>1</b>\r\n</a>', newline='')
+        for chunks, differs in (
+            (['<a>\r\n', '  <b>1</b>', '\r\n</a>'], False),
+            (['<a>\r\n  <b>1</b>\r\n</a>'], False),
+            (['<a>\n  <b>1</b>\n</a>'], True),
+            (['<a>\r\n  <b>2</b>\r\n</a>'], True),
+            (['<a>\r\n  <b>1</b>'], True),
+            (['<a>\r\n  <b>1</b>\r\n</a>', '\n'], True),
+        ):
+            with self.subTest(chunks=chunks):
+                with CompareWriter(self.path) as sink:
+                    for chunk in chunks:
+                        sink.write(chunk)
+                self.assertEqual(sink.differs, differs)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['ossec.conf'])
+
+    def test_write_atomic_replaces_file(self):
+        self.write('old')
+        write_atomic(FakeModule(), self.path, 'new', fsync=True)
+        fsync_dirs([self.path])
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['ossec.conf'])
+
+    def test_write_atomic_leaves_no_temp_file_on_error(self):
+        class FailingModule:
+            def atomic_move(self, src, dest):
+                raise OSError('read-only file system')
+
+        self.write('old')
+        with self.assertRaises(OSError):
+            write_atomic(FailingModule(), self.path, 'new')
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.tmpdir.name), ['ossec.conf'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
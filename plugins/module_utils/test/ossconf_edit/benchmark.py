@@ -0,0 +1,51 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the peak Python allocations of parse_document
+
+Compares parse_document, which feeds the parser in chunks, with wrapping, substituting
+and encoding the whole buffer first.  Run it directly, it prints the peaks:
+
+    python plugins/module_utils/test/ossconf_edit/benchmark.py
+"""
+
+import re
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Add wazuh directory to path to import ossconf_edit module
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'wazuh'))
+
+from lxml import etree
+from ossconf_edit import parse_document
+
+BLOCK = '  <localfile>\n    <location>/var/log/app.log</location>\n    <log_format>syslog</log_format>\n  </localfile>\n'
+
+
+def whole_buffer_parse(xml_content):
+    wrapped_xml = re.sub('&', '--AMP-SYMBOL-SUBST--', '<root>' + xml_content + '</root>')
+    return etree.fromstring(wrapped_xml.encode('utf-8'))
+
+
+def peak_allocations(parse, content):
+    """Return the peak of Python allocations while parse(content) runs, in bytes."""
+    tracemalloc.start()
+    try:
+        parse(content)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    for name, content in (
+        ('no ampersands', '<ossec_config>\n' + BLOCK * 20000 + '</ossec_config>'),
+        ('ampersands', '<ossec_config>\n' + BLOCK.replace('app.log', 'a&b.log') * 20000 + '</ossec_config>'),
+    ):
+        peaks = {parse.__name__: peak_allocations(parse, content) for parse in (whole_buffer_parse, parse_document)}
+        print(f"{name}, {len(content)} chars: " + ', '.join(f'{k} peak {v // 1024} KiB' for k, v in peaks.items()))
+
+
+if __name__ == '__main__':
+    main()
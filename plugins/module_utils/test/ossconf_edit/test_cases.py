@@ -1049,5 +1049,187 @@ test_cases = [
             </ossec_config>
         """,
     },
+    {   # task block building new nested nodes step by step
+        "xml_from": """
+            <ossec_config>
+              <client>
+                <server>
+                  <address>addr</address>
+                </server>
+              </client>
+            </ossec_config>
+        """,
+        "task_block": [
+            {
+                "xpath": "/ossec_config/client/server/address",
+                "value": "10.0.0.1",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='custom-telegram']/hook_url",
+                "value": "https://example.com/hook",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='custom-telegram']/level",
+                "value": "3",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='custom-telegram']/alert_format",
+                "value": "json",
+                "when_xpath_exist": "/ossec_config/integration[name='custom-telegram']",
+            },
+            {
+                "xpath": "/agent_config/localfile[location='/var/log/messages']/log_format",
+                "value": "syslog",
+            },
+            {
+                "xpath": "/agent_config/localfile[location='/var/log/messages']/frequency",
+                "value": "60",
+            },
+        ],
+        "xml_to": """
+            <ossec_config>
+              <client>
+                <server>
+                  <address>10.0.0.1</address>
+                </server>
+              </client>
+              <integration>
+                <name>custom-telegram</name>
+                <hook_url>https://example.com/hook</hook_url>
+                <level>3</level>
+                <alert_format>json</alert_format>
+              </integration>
+            </ossec_config>
+            <agent_config>
+              <localfile>
+                <location>/var/log/messages</location>
+                <log_format>syslog</log_format>
+                <frequency>60</frequency>
+              </localfile>
+            </agent_config>
+        """,
+    },
+    {   # positional predicate selects the n-th node
+        "xml_from": """
+            <ossec_config>
+              <localfile>
+                <location>/var/log/auth.log</location>
+              </localfile>
+              <localfile>
+                <location>/var/log/syslog</location>
+              </localfile>
+            </ossec_config>
+        """,
+        "xpath": "/ossec_config/localfile[2]",
+        "attributes": {"enabled": "no"},
+        "xml_to": """
+            <ossec_config>
+              <localfile>
+                <location>/var/log/auth.log</location>
+              </localfile>
+              <localfile enabled="no">
+                <location>/var/log/syslog</location>
+              </localfile>
+            </ossec_config>
+        """,
+    },
+    {   # every predicate of a step must match, a new node gets all of them
+        "xml_from": """
+            <group name="local,">
+              <rule id="100100" level="3">
+                <match>first</match>
+              </rule>
+            </group>
+        """,
+        "xpath": "/group[@name='local,']/rule[@id='100100'][@level='5']/match",
+        "value": "second",
+        "xml_to": """
+            <group name="local,">
+              <rule id="100100" level="3">
+                <match>first</match>
+              </rule>
+              <rule id="100100" level="5">
+                <match>second</match>
+              </rule>
+            </group>
+        """,
+    },
+    {   # lookups by child predicate follow nodes created and renamed earlier in the block
+        "xml_from": """
+            <ossec_config>
+              <integration>
+                <name>pagerduty</name>
+              </integration>
+            </ossec_config>
+        """,
+        "task_block": [
+            {
+                "xpath": "/ossec_config/integration[name='slack']/level",
+                "value": "10",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='slack']/name",
+                "value": "slack-ops",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='slack-ops']/alert_format",
+                "value": "json",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='slack']/level",
+                "value": "5",
+            },
+            {
+                "xpath": "/ossec_config/integration[name='pagerduty']/level",
+                "value": "12",
+            },
+        ],
+        "xml_to": """
+            <ossec_config>
+              <integration>
+                <name>pagerduty</name>
+                <level>12</level>
+              </integration>
+              <integration>
+                <name>slack-ops</name>
+                <level>10</level>
+                <alert_format>json</alert_format>
+              </integration>
+              <integration>
+                <name>slack</name>
+                <level>5</level>
+              </integration>
+            </ossec_config>
+        """,
+    },
+    {   # a key child that gains child elements no longer matches its old text later in the block
+        "xml_from": """
+            <ossec_config>
+              <localfile>
+                <location>1</location>
+              </localfile>
+            </ossec_config>
+        """,
+        "task_block": [
+            {
+                "xpath": "/ossec_config/localfile[location='1']/location/log/location",
+                "value": "2",
+            },
+            {
+                "xpath": "/ossec_config/localfile[location='1']/log_format[@k='x']",
+                "attributes": {"z": "q"},
+            },
+        ],
+        "xml_to": """
+            <ossec_config>
+              <localfile>
+                <location>1<log><location>2</location></log></location>
+              </localfile>
+              <localfile>
+                <location>1</location>
+                <log_format k="x" z="q"/>
+              </localfile>
+            </ossec_config>
+        """,
+    },
 ]
-
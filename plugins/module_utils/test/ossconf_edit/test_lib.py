@@ -1,6 +1,8 @@
 import unittest
+import io
 import re
 import sys
+import tempfile
 from pathlib import Path
 
 # Add wazuh directory to path to import ossconf_edit module
@@ -9,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'wazuh'))
 sys.path.insert(0, str(Path(__file__).parent))
 
 from lxml import etree
-from ossconf_edit import ossconf_edit, convert_xml_content
+from ossconf_edit import ossconf_edit, ossconf_edit_stream, convert_xml_content, parse_document, serialize_document
 from . import test_cases as test_cases_module
 
 test_cases = test_cases_module.test_cases
@@ -103,6 +105,85 @@ class TestAssconfEdit(unittest.TestCase):
                         f"But got:\n{result}"
                     )
 
+    def test_task_block_matches_sequential_operations(self):
+        """task_block output must be byte-for-byte the result of applying operations one by one"""
+        for i, test_case in enumerate(test_cases):
+            if 'task_block' not in test_case:
+                continue
+            with self.subTest(test_case_index=i):
+                expected = test_case['xml_from']
+                for operation in test_case['task_block']:
+                    expected = ossconf_edit(expected, **operation)
+                self.assertEqual(ossconf_edit(test_case['xml_from'], task_block=test_case['task_block']), expected)
+
+    def test_stream_matches_ossconf_edit(self):
+        """Streaming mode must write exactly what ossconf_edit returns"""
+        for i, test_case in enumerate(test_cases):
+            with self.subTest(test_case_index=i):
+                operations = test_case.get('task_block') or [{
+                    key: test_case[key]
+                    for key in ('xpath', 'value', 'attributes', 'xml_set_raw', 'when_xpath_exist')
+                    if key in test_case
+                }]
+                with tempfile.NamedTemporaryFile('w', suffix='.xml') as f:
+                    f.write(test_case['xml_from'])
+                    f.flush()
+                    destination = io.StringIO()
+                    written = ossconf_edit_stream(f.name, destination, task_block=operations)
+
+                expected = ossconf_edit(test_case['xml_from'], task_block=operations)
+                self.assertEqual(destination.getvalue() if written else test_case['xml_from'], expected)
+
+    def test_unchanged_document_is_returned_as_is(self):
+        """Operations that find everything in place must not re-serialize the document"""
+        xml = '<ossec_config><client><server><address>10.0.0.1</address></server></client></ossec_config>\n'
+        for operation in (
+            {'xpath': '/ossec_config/client/server/address', 'value': '10.0.0.1'},
+            {'xpath': '/ossec_config/client/server', 'xml_set_raw': '<server><address>10.0.0.1</address></server>'},
+            {'xpath': '/ossec_config/client/server/address', 'value': '1', 'when_xpath_exist': '/ossec_config/missing'},
+        ):
+            with self.subTest(operation=operation):
+                self.assertIs(ossconf_edit(xml, task_block=[operation]), xml)
+        result = ossconf_edit(xml, '/ossec_config/client/server', attributes={'id': '1'})
+        self.assertIsNot(result, xml)
+        self.assertIs(ossconf_edit(result, '/ossec_config/client/server', attributes={'id': '1'}), result)
+
+    def test_stream_rejects_relative_xpath(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.xml') as f:
+            f.write('<group name="a,"></group>')
+            f.flush()
+            with self.assertRaises(ValueError):
+                ossconf_edit_stream(f.name, io.StringIO(), xpath="group[@name='a,']/rule", value='1')
+
+
+class TestParseDocument(unittest.TestCase):
+
+    def test_ampersands_preserved(self):
+        xml = '<ossec_config>\n  <command>a && b &amp; c &lt;d&gt;</command>\n  <x>1</x>\n</ossec_config>'
+        result = ossconf_edit(xml, '/ossec_config/x', '2')
+        self.assertEqual(result, xml.replace('<x>1</x>', '<x>2</x>'))
+
+    def test_parse_in_chunks_matches_whole_buffer(self):
+        """Parsing in small chunks gives the tree and output of a whole buffer parse"""
+        xml = (
+            '<ossec_config>\n'
+            '  <command>a && b &amp; c &lt;d&gt;</command>\n'
+            '  <localfile>\n'
+            '    <location>/var/log/a&b.log</location>\n'
+            '    <log_format>syslög</log_format>\n'
+            '  </localfile>\n'
+            '</ossec_config>\n'
+            '<rules>&amp;&</rules>'
+        )
+        whole = etree.fromstring(('<root>' + convert_xml_content(xml) + '</root>').encode('utf-8'))
+        expected = etree.tostring(whole)
+        for chunk_size in (1, 2, 3, 5, 16, len(xml)):
+            with self.subTest(chunk_size=chunk_size):
+                root = parse_document(xml, chunk_size=chunk_size)
+                self.assertEqual(etree.tostring(root), expected)
+                self.assertEqual(serialize_document(root), serialize_document(whole))
+        self.assertIn('<rules>&amp;&</rules>', serialize_document(parse_document(xml, chunk_size=1)))
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Tests for the no-op result cache"""
+
+import unittest
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add module_utils directory to path to import resultcache module
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import resultcache
+from resultcache import operation_digest, file_state, is_known_noop, record_noop
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        self.path = os.path.join(self.tmpdir.name, 'docker-compose.yml')
+        with open(self.path, 'w') as f:
+            f.write('services:\n  wazuh.manager:\n    image: wazuh/wazuh-manager:4.14.2\n')
+        self.digest = operation_digest('yamledit', key='services.wazuh.manager.image', value='wazuh/wazuh-manager:4.14.2')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, digest=None):
+        record_noop(self.cache_dir, self.path, file_state(self.path), digest or self.digest)
+
+    def test_recorded_noop_is_known(self):
+        """A recorded operation is known on the same file, other operations are not"""
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, self.digest))
+        self.record()
+        self.assertTrue(is_known_noop(self.cache_dir, self.path, self.digest))
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, operation_digest('yamledit', key='x', value=1)))
+
+    def test_operation_digest(self):
+        """The digest depends on the module name and parameters, not on the order of dict keys"""
+        self.assertEqual(operation_digest('m', a={'x': 1, 'y': [2]}, b=None), operation_digest('m', b=None, a={'y': [2], 'x': 1}))
+        self.assertNotEqual(operation_digest('m', a=1), operation_digest('m', a='1'))
+        self.assertNotEqual(operation_digest('m', a=1), operation_digest('n', a=1))
+
+    def test_changed_file_is_not_known(self):
+        """Changing the content, or only its mtime, invalidates the recorded operations"""
+        self.record()
+        with open(self.path, 'a') as f:
+            f.write('    hostname: wazuh.manager\n')
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, self.digest))
+
+        self.record()
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, self.digest))
+
+    def test_several_operations_per_file(self):
+        """Every task editing the file keeps its own digest, up to MAX_CACHED_OPERATIONS"""
+        digests = [operation_digest('yamledit', key=f'key{i}') for i in range(resultcache.MAX_CACHED_OPERATIONS + 1)]
+        for digest in digests:
+            self.record(digest)
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, digests[0]))
+        for digest in digests[1:]:
+            self.assertTrue(is_known_noop(self.cache_dir, self.path, digest))
+
+    def test_file_changed_after_state_is_not_recorded(self):
+        """Nothing is recorded when the file changed after its state was taken"""
+        state = file_state(self.path)
+        with open(self.path, 'a') as f:
+            f.write('volumes: {}\n')
+        record_noop(self.cache_dir, self.path, state, self.digest)
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, self.digest))
+
+    def test_broken_cache_is_ignored(self):
+        """An unreadable cache entry is a miss and is replaced by the next record"""
+        self.record()
+        entry_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(entry_path, 'w') as f:
+            f.write('{not json')
+        self.assertFalse(is_known_noop(self.cache_dir, self.path, self.digest))
+        self.record()
+        self.assertTrue(is_known_noop(self.cache_dir, self.path, self.digest))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
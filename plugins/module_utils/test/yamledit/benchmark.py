@@ -0,0 +1,69 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""Benchmark of the pure Python and libyaml loaders and dumpers used by yamledit
+
+Run it directly, it prints the load and dump timings of both implementations:
+
+    python plugins/module_utils/test/yamledit/benchmark.py
+"""
+
+import time
+
+import yaml
+
+DUMP_ARGS = dict(default_flow_style=False, allow_unicode=True, sort_keys=False)
+
+BENCHMARK_DOCUMENTS = {
+    'compose': {'services': {
+        f'service{i}': {
+            'image': f'registry.example.com/app{i}:4.14.1',
+            'hostname': f'service{i}',
+            'restart': 'always',
+            'environment': [f'VAR{j}=value {j}' for j in range(10)],
+            'ports': [f'{1500 + i}:{1500 + i}'],
+            'volumes': [f'data{i}:/var/lib/app', './config/app.yml:/etc/app.yml:ro'],
+        } for i in range(150)
+    }},
+    'internal_users': {
+        f'user{i}': {
+            'hash': '$2y$12$' + 'x' * 53,
+            'reserved': i % 2 == 0,
+            'backend_roles': ['admin', 'kibanauser'],
+            'description': f'Demo user number {i}',
+        } for i in range(500)
+    },
+}
+
+
+def time_load_dump(content, loader, dumper, repeat=5):
+    """Return the best load and dump times of content, in seconds."""
+    load_times = []
+    dump_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        loaded = yaml.load(content, Loader=loader)
+        load_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        yaml.dump(loaded, Dumper=dumper, **DUMP_ARGS)
+        dump_times.append(time.perf_counter() - start)
+    return min(load_times), min(dump_times)
+
+
+def main():
+    implementations = [('python', yaml.SafeLoader, yaml.SafeDumper)]
+    if yaml.__with_libyaml__:
+        implementations.append(('libyaml', yaml.CSafeLoader, yaml.CSafeDumper))
+    else:
+        print('PyYAML is built without libyaml, only the pure Python implementation is timed')
+
+    for name, data in BENCHMARK_DOCUMENTS.items():
+        content = yaml.dump(data, **DUMP_ARGS)
+        timings = {implementation: time_load_dump(content, loader, dumper)
+                   for implementation, loader, dumper in implementations}
+        print(f"{name}, {len(content)} chars: " + ', '.join(
+            f'{k} load {v[0] * 1000:.1f} ms dump {v[1] * 1000:.1f} ms' for k, v in timings.items()))
+
+
+if __name__ == '__main__':
+    main()
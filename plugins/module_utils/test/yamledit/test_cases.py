@@ -375,6 +375,161 @@ packages:
 packages:
 - nginx
 - redis
+'''
+    },
+
+    # Test 21: Several operations applied to the same document
+    {
+        'description': 'Operations list - replace image with build',
+        'yaml_from': '''
+services:
+  wazuh.manager:
+    image: wazuh/wazuh-manager:4.14.1
+    hostname: wazuh.manager
+    ports:
+    - 1514:1514
+''',
+        'separator': '#',
+        'operations': [
+            {'key': 'services#wazuh.manager#image', 'state': 'absent'},
+            {'key': 'services#wazuh.manager#build', 'value': {'context': '.'}},
+            {'key': 'services#wazuh.manager#ports', 'value': '1515:1515', 'append_unique': True},
+            {'key': 'services#wazuh.manager#ports', 'value': '1514:1514', 'append_unique': True},
+            {'key': 'volumes.wazuh_etc', 'separator': '.', 'value': {}},
+        ],
+        'yaml_to': '''
+services:
+  wazuh.manager:
+    hostname: wazuh.manager
+    ports:
+    - 1514:1514
+    - 1515:1515
+    build:
+      context: .
+volumes:
+  wazuh_etc: {}
+'''
+    },
+
+    # Test 22: Append unique with a list of values
+    {
+        'description': 'Append unique - batch of values',
+        'yaml_from': '''
+rules:
+- nginx
+- {port: 80, proto: tcp}
+''',
+        'key': 'rules',
+        'separator': '.',
+        'values': ['redis', {'proto': 'tcp', 'port': 80}, 'nginx', 'redis', {'port': 443, 'proto': 'tcp'}, ['a', 'b']],
+        'state': 'present',
+        'append_unique': True,
+        'yaml_to': '''
+rules:
+- nginx
+- {port: 80, proto: tcp}
+- redis
+- {port: 443, proto: tcp}
+- [a, b]
+'''
+    },
+
+    # Test 23: Wildcard step sets the value in every matching node
+    {
+        'description': 'Wildcard - set in every service',
+        'yaml_from': '''
+services:
+  wazuh.manager:
+    image: wazuh/wazuh-manager:4.14.1
+  wazuh.indexer:
+    image: wazuh/wazuh-indexer:4.14.1
+    restart: "no"
+  wazuh.dashboard:
+    image: wazuh/wazuh-dashboard:4.14.1
+''',
+        'key': 'services.*.restart',
+        'separator': '.',
+        'value': 'always',
+        'state': 'present',
+        'yaml_to': '''
+services:
+  wazuh.manager:
+    image: wazuh/wazuh-manager:4.14.1
+    restart: always
+  wazuh.indexer:
+    image: wazuh/wazuh-indexer:4.14.1
+    restart: always
+  wazuh.dashboard:
+    image: wazuh/wazuh-dashboard:4.14.1
+    restart: always
+'''
+    },
+
+    # Test 24: Wildcard step removes the key from every matching node
+    {
+        'description': 'Wildcard - remove from every list item',
+        'yaml_from': '''
+users:
+- name: admin
+  password: secret
+- name: kibanaserver
+- name: reader
+  password: secret
+''',
+        'key': 'users.*.password',
+        'separator': '.',
+        'state': 'absent',
+        'yaml_to': '''
+users:
+- name: admin
+- name: kibanaserver
+- name: reader
+'''
+    },
+
+    # Test 25: Escaped separator inside a key
+    {
+        'description': 'Escaped separator in key',
+        'yaml_from': '''
+metadata:
+  annotations:
+    app.kubernetes.io/name: wazuh
+''',
+        'key': 'metadata.annotations.app\\.kubernetes\\.io/name',
+        'separator': '.',
+        'value': 'wazuh-manager',
+        'state': 'present',
+        'yaml_to': '''
+metadata:
+  annotations:
+    app.kubernetes.io/name: wazuh-manager
+'''
+    },
+
+    # Test 26: Wildcard step appends to every matching list
+    {
+        'description': 'Wildcard - append unique in every service',
+        'yaml_from': '''
+services:
+  wazuh.manager:
+    networks:
+    - wazuh
+  wazuh.indexer: {}
+''',
+        'key': 'services.*.networks',
+        'separator': '.',
+        'value': 'monitoring',
+        'state': 'present',
+        'append_unique': True,
+        'yaml_to': '''
+services:
+  wazuh.manager:
+    networks:
+    - wazuh
+    - monitoring
+  wazuh.indexer:
+    networks:
+    - monitoring
 '''
     },
 ]
@@ -4,8 +4,10 @@
 """Tests for yamledit module"""
 
 import unittest
+import importlib.util
 import sys
 from pathlib import Path
+from unittest import mock
 
 # Add module_utils directory to path to import yamledit module
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -13,11 +15,14 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 sys.path.insert(0, str(Path(__file__).parent))
 
 import yaml
-from yamledit import yamledit
+from yamledit import yamledit, compile_key, KeyStep
 from . import test_cases as test_cases_module
+from .benchmark import BENCHMARK_DOCUMENTS, DUMP_ARGS
 
 test_cases = test_cases_module.test_cases
 
+YAMLEDIT_PATH = Path(__file__).parent.parent.parent / 'yamledit.py'
+
 
 def normalize_yaml(yaml_str):
     """
@@ -42,11 +47,13 @@ class TestYamlEdit(unittest.TestCase):
             with self.subTest(test_case_index=i, description=test_case.get('description', 'N/A')):
                 yaml_from = test_case['yaml_from']
                 expected = test_case['yaml_to']
-                key = test_case['key']
+                key = test_case.get('key')
                 separator = test_case.get('separator', '.')
                 value = test_case.get('value')
                 state = test_case.get('state', 'present')
                 append_unique = test_case.get('append_unique', False)
+                operations = test_case.get('operations')
+                values = test_case.get('values')
 
                 # Execute the yamledit function
                 result = yamledit(
@@ -55,7 +62,9 @@ class TestYamlEdit(unittest.TestCase):
                     separator=separator,
                     value=value,
                     state=state,
-                    append_unique=append_unique
+                    append_unique=append_unique,
+                    operations=operations,
+                    values=values
                 )
 
                 # Normalize both result and expected for comparison
@@ -75,6 +84,221 @@ class TestYamlEdit(unittest.TestCase):
                     f"Got:\n{normalized_result}"
                 )
 
+    def test_operations_match_sequential_calls(self):
+        """An operations list gives the same document as one call per operation"""
+        for i, test_case in enumerate(test_cases):
+            if 'operations' not in test_case:
+                continue
+            with self.subTest(test_case_index=i, description=test_case.get('description', 'N/A')):
+                expected = test_case['yaml_from']
+                for operation in test_case['operations']:
+                    operation = dict(operation)
+                    operation.setdefault('separator', test_case.get('separator', '.'))
+                    expected = yamledit(expected, **operation)
+                result = yamledit(test_case['yaml_from'], separator=test_case.get('separator', '.'), operations=test_case['operations'])
+                self.assertEqual(result, expected)
+
+    def test_round_trip_matches_all_cases(self):
+        """round_trip gives the same data as a full dump for all cases"""
+        for i, test_case in enumerate(test_cases):
+            with self.subTest(test_case_index=i, description=test_case.get('description', 'N/A')):
+                kwargs = dict(
+                    key=test_case.get('key'),
+                    separator=test_case.get('separator', '.'),
+                    value=test_case.get('value'),
+                    state=test_case.get('state', 'present'),
+                    append_unique=test_case.get('append_unique', False),
+                    operations=test_case.get('operations'),
+                    values=test_case.get('values'),
+                )
+                result = yamledit(test_case['yaml_from'], round_trip=True, **kwargs)
+                self.assertEqual(normalize_yaml(result), normalize_yaml(test_case['yaml_to']))
+
+    def test_round_trip_keeps_untouched_text(self):
+        """round_trip rewrites only the edited entries, comments and quoting elsewhere are kept"""
+        yaml_content = (
+            "# Compose file\n"
+            "services:\n"
+            "  wazuh.manager:\n"
+            "    image: wazuh/wazuh-manager:4.14.2  # pinned\n"
+            "    hostname: \"wazuh.manager\"\n"
+            "    ports:\n"
+            "      - \"1514:1514\"\n"
+            "      - \"1515:1515\"\n"
+            "\n"
+            "volumes:\n"
+            "  wazuh_etc: {}\n"
+            "  # filebeat volumes\n"
+            "  filebeat_etc: {}\n"
+        )
+        result = yamledit(yaml_content, separator='#', round_trip=True, operations=[
+            {'key': 'services#wazuh.manager#image', 'state': 'absent'},
+            {'key': 'services#wazuh.manager#ports', 'value': '1516:1516', 'append_unique': True},
+            {'key': 'volumes#new_vol', 'value': {}},
+        ])
+        self.assertEqual(result, (
+            "# Compose file\n"
+            "services:\n"
+            "  wazuh.manager:\n"
+            "    hostname: \"wazuh.manager\"\n"
+            "    ports:\n"
+            "      - \"1514:1514\"\n"
+            "      - \"1515:1515\"\n"
+            "      - 1516:1516\n"
+            "\n"
+            "volumes:\n"
+            "  wazuh_etc: {}\n"
+            "  # filebeat volumes\n"
+            "  filebeat_etc: {}\n"
+            "  new_vol: {}\n"
+        ))
+
+    def test_round_trip_unchanged_returns_input(self):
+        """round_trip returns the text as is when nothing changes"""
+        yaml_content = "# settings\nserver:\n  port: 8080  # default\n"
+        self.assertEqual(yamledit(yaml_content, key='server.port', value=8080, round_trip=True), yaml_content)
+
+    def test_round_trip_type_changes(self):
+        """round_trip writes values equal to the old ones under == but of another type"""
+        yaml_content = "enabled: 1  # flag\nratio: 1.0\nport: 80\nitems: [1, 2]\n"
+        self.assertEqual(yamledit(yaml_content, key='enabled', value=True, round_trip=True),
+                         "enabled: true  # flag\nratio: 1.0\nport: 80\nitems: [1, 2]\n")
+        self.assertEqual(yamledit(yaml_content, key='ratio', value=1, round_trip=True),
+                         "enabled: 1  # flag\nratio: 1\nport: 80\nitems: [1, 2]\n")
+        self.assertEqual(yamledit(yaml_content, key='port', value=80.0, round_trip=True),
+                         "enabled: 1  # flag\nratio: 1.0\nport: 80.0\nitems: [1, 2]\n")
+        self.assertEqual(yaml.safe_load(yamledit(yaml_content, key='items', value=[True, 2.0, 3], round_trip=True))['items'],
+                         [True, 2.0, 3])
+
+    def test_noop_returns_content_as_is(self):
+        """Operations that change nothing return the content without dumping it"""
+        yaml_content = "# settings\nserver: {port: 8080, hosts: ['a', 'b']}\n"
+        for kwargs in (
+            dict(key='server.port', value=8080),
+            dict(key='server.hosts', value=['a', 'b']),
+            dict(key='server.hosts', value='a', append_unique=True),
+            dict(key='server.debug', state='absent'),
+            dict(key='server.hosts.5', state='absent'),
+        ):
+            with self.subTest(**kwargs):
+                self.assertIs(yamledit(yaml_content, **kwargs), yaml_content)
+
+    def test_same_value_of_other_type_is_a_change(self):
+        """Values equal in Python but dumped differently (1 and True) are still set"""
+        result = yamledit("enabled: 1\nports: [1, 2]\n", key='enabled', value=True)
+        self.assertEqual(yaml.safe_load(result), {'enabled': True, 'ports': [1, 2]})
+        result = yamledit("ports: [1, 2]\n", key='ports', value=[1.0, 2])
+        self.assertEqual(repr(yaml.safe_load(result)['ports']), '[1.0, 2]')
+
+    def test_append_unique_values_large_list(self):
+        """Batch append_unique keeps the first occurrence of every value, in order"""
+        existing = [f'host-{i}' for i in range(5000)] + [{'name': 'x', 'ports': [1, 2]}, 1]
+        values = [f'host-{i}' for i in range(2500, 10000)] + [{'ports': [1, 2], 'name': 'x'}, True, 1.0, [{'a': 1}]]
+        result = yaml.safe_load(yamledit(yaml.safe_dump({'hosts': existing}), key='hosts', values=values, append_unique=True))
+        expected = existing + [f'host-{i}' for i in range(5000, 10000)] + [True, 1.0, [{'a': 1}]]
+        self.assertEqual(result['hosts'], expected)
+        self.assertEqual([type(item) for item in result['hosts'][-3:]], [bool, float, list])
+
+    def test_values_without_append_unique_raises_error(self):
+        """Test that values without append_unique raises ValueError"""
+        with self.assertRaises(ValueError) as context:
+            yamledit("items: []", key='items', values=['a'])
+        self.assertIn('values parameter can only be used with append_unique', str(context.exception))
+
+    def test_compile_key(self):
+        """Keys are compiled once into classified steps, with escapes and wildcards"""
+        self.assertEqual(compile_key('servers.0.*.name'), (
+            KeyStep('servers', None, False), KeyStep('0', 0, False), KeyStep('*', None, True), KeyStep('name', None, False),
+        ))
+        self.assertEqual(compile_key('a\\.b::\\*::c\\d\\\\', '::'), (
+            KeyStep('a\\.b', None, False), KeyStep('*', None, False), KeyStep('c\\d\\', None, False),
+        ))
+        self.assertEqual(compile_key('a\\::b::c', '::'), (KeyStep('a::b', None, False), KeyStep('c', None, False)))
+        self.assertIs(compile_key('services.*.image'), compile_key('services.*.image'))
+
+    def test_wildcard_values_are_not_shared(self):
+        """Every node matched by a wildcard gets its own copy of the value, dumped without aliases"""
+        result = yamledit("a: {x: 1}\nb: {x: 2}\n", key='*.ports', value=['1514:1514'])
+        self.assertNotIn('&', result)
+        self.assertEqual(yaml.safe_load(result), {'a': {'x': 1, 'ports': ['1514:1514']}, 'b': {'x': 2, 'ports': ['1514:1514']}})
+
+    def test_list_gap_over_limit_raises_error(self):
+        """Test that setting an index far past the end of a list raises ValueError"""
+        yaml_content = "items:\n  - apple\n  - banana"
+        with self.assertRaises(ValueError) as context:
+            yamledit(yaml_content, key='items.100000', value='value')
+        self.assertIn("Index 100000 is 99998 items past the end of the list of 2 items at 'items'", str(context.exception))
+        with self.assertRaises(ValueError):
+            yamledit(yaml_content, key='items.5.name', value='value', max_list_gap=2)
+        with self.assertRaises(ValueError):
+            yamledit(yaml_content, key='matrix.7.0', value='value', max_list_gap=6)
+
+    def test_list_gap_within_limit(self):
+        """Indices up to max_list_gap past the end of a list pad it with nulls"""
+        yaml_content = "items:\n  - apple\n"
+        result = yaml.safe_load(yamledit(yaml_content, key='items.4', value='x', max_list_gap=3))
+        self.assertEqual(result['items'], ['apple', None, None, None, 'x'])
+        result = yaml.safe_load(yamledit(yaml_content, key='items.1000', value='x', max_list_gap=None))
+        self.assertEqual(len(result['items']), 1001)
+
+    def test_document_selector_edits_matching_documents(self):
+        """Only the documents selected in a multi-document stream are edited, the others are kept as is"""
+        yaml_content = (
+            "# manifests\n"
+            "---\n"
+            "kind: ConfigMap   # settings\n"
+            "metadata: {name: wazuh-conf}\n"
+            "--- # manager\n"
+            "kind: Deployment\n"
+            "metadata: {name: wazuh-manager}\n"
+            "spec: {replicas: 1}\n"
+            "---\n"
+            "kind: Deployment\n"
+            "metadata: {name: wazuh-dashboard}\n"
+        )
+        result = yamledit(yaml_content, key='spec.replicas', value=3, document={'kind': 'Deployment'})
+        self.assertEqual(result, (
+            "# manifests\n"
+            "---\n"
+            "kind: ConfigMap   # settings\n"
+            "metadata: {name: wazuh-conf}\n"
+            "--- # manager\n"
+            "kind: Deployment\n"
+            "metadata:\n"
+            "  name: wazuh-manager\n"
+            "spec:\n"
+            "  replicas: 3\n"
+            "---\n"
+            "kind: Deployment\n"
+            "metadata:\n"
+            "  name: wazuh-dashboard\n"
+            "spec:\n"
+            "  replicas: 3\n"
+        ))
+        result = yamledit(yaml_content, key='spec.replicas', value=2, document={'metadata.name': 'wazuh-manager'})
+        self.assertEqual([d['spec']['replicas'] for d in yaml.safe_load_all(result) if 'spec' in d], [2])
+        result = yamledit(yaml_content, key='data.a', value='1', document=-3)
+        self.assertEqual(list(yaml.safe_load_all(result))[0]['data'], {'a': '1'})
+        self.assertIs(yamledit(yaml_content, key='kind', value='Deployment', document=1), yaml_content)
+
+    def test_document_selector_without_match_raises_error(self):
+        """Test that a selector matching no document raises ValueError"""
+        yaml_content = "kind: ConfigMap\n---\nkind: Service\n"
+        for document in (2, -3, {'kind': 'Deployment'}):
+            with self.subTest(document=document):
+                with self.assertRaises(ValueError) as context:
+                    yamledit(yaml_content, key='a', value=1, document=document)
+                self.assertIn('No document in the YAML stream matches', str(context.exception))
+        with self.assertRaises(ValueError) as context:
+            yamledit(yaml_content, key='a', value=1, document=['kind'])
+        self.assertIn('document must be an index or a dict', str(context.exception))
+
+    def test_operation_without_key_raises_error(self):
+        """Test that an operation without key raises ValueError"""
+        with self.assertRaises(ValueError) as context:
+            yamledit("name: test", operations=[{'key': 'name', 'value': 'x'}, {'value': 'y'}])
+        self.assertIn('key parameter cannot be empty', str(context.exception))
+
     def test_empty_key_raises_error(self):
         """Test that empty key raises ValueError"""
         yaml_content = "name: test"
@@ -118,5 +342,38 @@ class TestYamlEdit(unittest.TestCase):
         self.assertIn('append_unique cannot be used with list index', str(context.exception))
 
 
+class TestLibyaml(unittest.TestCase):
+
+    @unittest.skipUnless(yaml.__with_libyaml__, 'PyYAML is built without libyaml')
+    def test_libyaml_matches_pure_python(self):
+        """The libyaml loader and dumper give the same results as the pure Python ones"""
+        content = yaml.dump(BENCHMARK_DOCUMENTS['compose'], **DUMP_ARGS)
+        for implementation, loader, dumper in (
+            ('python', yaml.SafeLoader, yaml.SafeDumper),
+            ('libyaml', yaml.CSafeLoader, yaml.CSafeDumper),
+        ):
+            with self.subTest(implementation=implementation):
+                loaded = yaml.load(content, Loader=loader)
+                self.assertEqual(loaded, BENCHMARK_DOCUMENTS['compose'])
+                self.assertEqual(yaml.dump(loaded, Dumper=dumper, **DUMP_ARGS), content)
+
+    def test_pure_python_fallback(self):
+        """yamledit works with the pure Python loader and dumper when PyYAML has no libyaml"""
+        spec = importlib.util.spec_from_file_location('yamledit_without_libyaml', YAMLEDIT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(yaml.__dict__):
+            yaml.__dict__.pop('CSafeLoader', None)
+            yaml.__dict__.pop('CSafeDumper', None)
+            spec.loader.exec_module(module)
+
+        self.assertIs(module.SafeLoader, yaml.SafeLoader)
+        self.assertIs(module.SafeDumper, yaml.SafeDumper)
+        yaml_content = "server:\n  port: 8080  # default\n  hosts: [a]\n"
+        self.assertEqual(module.yamledit(yaml_content, key='server.port', value=9090),
+                         "server:\n  port: 9090\n  hosts:\n  - a\n")
+        self.assertEqual(module.yamledit(yaml_content, key='server.port', value=9090, round_trip=True),
+                         "server:\n  port: 9090  # default\n  hosts: [a]\n")
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -2,10 +2,24 @@
 Core OpenSearch API utility functions for Wazuh Dashboard interactions
 """
 import requests, time, urllib3
+from requests.adapters import HTTPAdapter
 
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Maximum number of connections kept open to the dashboard by a client
+DEFAULT_POOL_MAXSIZE = 10
+
+# Number of objects sent in one request by the bulk functions
+DEFAULT_BULK_CHUNK_SIZE = 100
+
+# Number of objects asked for in one request when paging through _find results
+DEFAULT_PAGE_SIZE = 100
+
+
+class DashboardApiError(Exception):
+    """Error returned by the dashboard API, raised where no (success, data, error) tuple can be returned"""
+
 
 def get_dashboard_url(dashboard_host, port=443):
     """
@@ -34,34 +48,320 @@ def get_opensearch_headers():
     }
 
 
-def make_opensearch_request(method, url, username, password, **kwargs):
+def _new_session(pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class DashboardClient:
     """
-    Make an authenticated request to OpenSearch API
+    Client of the OpenSearch Dashboards API of a Wazuh Dashboard
+
+    It holds a requests.Session with a pool of keep-alive connections, so the TCP and
+    TLS handshakes are done once instead of on every call, and auth and headers are
+    set once. The methods return (success, response_data, error_message) tuples like
+    the module level functions, which use a cached client (see get_client).
+    """
+
+    def __init__(self, dashboard_host, username, password, port=443, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        """
+        Args:
+            dashboard_host: Hostname or IP of the dashboard
+            username: Dashboard username
+            password: Dashboard password
+            port: Port number (default: 443)
+            pool_maxsize: Maximum number of connections kept open (default: DEFAULT_POOL_MAXSIZE)
+        """
+        self.dashboard_url = get_dashboard_url(dashboard_host, port)
+        self.session = _new_session(pool_maxsize)
+        if username is not None:
+            self.session.auth = (username, password)
+        self.session.headers.update(get_opensearch_headers())
+        # Disable SSL verification for self-signed certs
+        self.session.verify = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the connections of the client."""
+        self.session.close()
+
+    def request(self, method, path, **kwargs):
+        """
+        Make an authenticated request to the API
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE)
+            path: Path of the API endpoint, e.g. '/api/saved_objects/_find'
+            **kwargs: Additional arguments passed to requests.Session.request()
+
+        Returns:
+            requests.Response: Response object
+
+        Raises:
+            requests.exceptions.RequestException: On connection or request errors
+        """
+        return self.session.request(method, f"{self.dashboard_url}{path}", **kwargs)
+
+    def call(self, method, path, **kwargs):
+        """
+        Make a request and return its JSON result
+
+        Returns:
+            tuple: (success: bool, response_data: dict or None, error_message: str or None)
+        """
+        try:
+            response = self.request(method, path, **kwargs)
+
+            if response.status_code == 200:
+                return True, response.json(), None
+            else:
+                error_msg = f"Status code: {response.status_code}, Response: {response.text}"
+                return False, None, error_msg
+
+        except requests.exceptions.ConnectionError:
+            error_msg = f"Could not connect to Wazuh Dashboard at {self.dashboard_url}"
+            return False, None, error_msg
+        except Exception as e:
+            return False, None, str(e)
+
+    def create_saved_object(self, object_type, object_data):
+        """
+        Create a saved object
+
+        Args:
+            object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+            object_data: Dictionary containing the object attributes
+
+        Returns:
+            tuple: (success: bool, response_data: dict or None, error_message: str or None)
+        """
+        return self.call('POST', f"/api/saved_objects/{object_type}", json=object_data)
+
+    def get_saved_object(self, object_type, object_id):
+        """
+        Retrieve a saved object
+
+        Args:
+            object_type: Type of saved object
+            object_id: ID of the object to retrieve
+
+        Returns:
+            tuple: (success: bool, response_data: dict or None, error_message: str or None)
+        """
+        return self.call('GET', f"/api/saved_objects/{object_type}/{object_id}")
+
+    def update_saved_object(self, object_type, object_id, object_data):
+        """
+        Update a saved object
+
+        Args:
+            object_type: Type of saved object
+            object_id: ID of the object to update
+            object_data: Dictionary containing the object attributes to update
+
+        Returns:
+            tuple: (success: bool, response_data: dict or None, error_message: str or None)
+        """
+        return self.call('PUT', f"/api/saved_objects/{object_type}/{object_id}", json=object_data)
+
+    def delete_saved_object(self, object_type, object_id):
+        """
+        Delete a saved object
+
+        Args:
+            object_type: Type of saved object
+            object_id: ID of the object to delete
+
+        Returns:
+            tuple: (success: bool, response_data: dict or None, error_message: str or None)
+        """
+        return self.call('DELETE', f"/api/saved_objects/{object_type}/{object_id}")
+
+    def iter_saved_objects(self, object_type, search_term=None, fields=None, per_page=DEFAULT_PAGE_SIZE):
+        """
+        Find saved objects, one page of per_page objects per request
+
+        Pages are requested as the objects are consumed, so a caller that stops iterating
+        early doesn't fetch the rest.
+
+        Args:
+            object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+            search_term: Optional search term to filter by title
+            fields: Optional list of attributes to return (e.g., ['title']), all of them by default
+            per_page: Number of objects asked for in one request
+
+        Yields:
+            dict: Saved objects
+
+        Raises:
+            DashboardApiError: If a request fails
+        """
+        # Build query parameters
+        params = {
+            'type': object_type,
+            'per_page': per_page
+        }
+
+        if search_term:
+            params['search'] = search_term
+            params['search_fields'] = 'title'
+
+        if fields:
+            params['fields'] = list(fields)
+
+        page = 1
+        seen = 0
+        while True:
+            params['page'] = page
+            success, data, error = self.call('GET', "/api/saved_objects/_find", params=params)
+            if not success:
+                raise DashboardApiError(error)
+            saved_objects = data.get('saved_objects', [])
+            yield from saved_objects
+            seen += len(saved_objects)
+            if len(saved_objects) < per_page or seen >= data.get('total', 0):
+                return
+            page += 1
+
+    def find_saved_objects(self, object_type, search_term=None, fields=None):
+        """
+        Find saved objects
+
+        Args:
+            object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+            search_term: Optional search term to filter by title
+            fields: Optional list of attributes to return (e.g., ['title']), all of them by default
+
+        Returns:
+            tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+        """
+        try:
+            return True, list(self.iter_saved_objects(object_type, search_term, fields)), None
+        except DashboardApiError as e:
+            return False, None, str(e)
+
+    def find_saved_object_by_title(self, object_type, title, fields=None):
+        """
+        Find the first saved object with exactly this title
+
+        The search stops at the first page holding it.
+
+        Args:
+            object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+            title: Title of the object
+            fields: Optional list of attributes to return, the title is always included
+
+        Returns:
+            tuple: (success: bool, saved_object: dict or None if not found, error_message: str or None)
+        """
+        if fields is not None and 'title' not in fields:
+            fields = list(fields) + ['title']
+        try:
+            for obj in self.iter_saved_objects(object_type, search_term=title, fields=fields):
+                if obj.get('attributes', {}).get('title') == title:
+                    return True, obj, None
+        except DashboardApiError as e:
+            return False, None, str(e)
+        return True, None, None
+
+    def bulk_create_saved_objects(self, objects, overwrite=False, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """
+        Create saved objects with the _bulk_create endpoint, chunk_size objects per request
+
+        Args:
+            objects: List of dicts with type, attributes and optionally id and references
+            overwrite: Replace the objects whose id already exists instead of failing on them
+            chunk_size: Number of objects sent in one request
+
+        Returns:
+            tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+                Objects that could not be created have an 'error' key in the list
+        """
+        params = {'overwrite': 'true'} if overwrite else None
+        return self._bulk('POST', "/api/saved_objects/_bulk_create", objects, chunk_size, params=params)
+
+    def bulk_get_saved_objects(self, objects, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """
+        Retrieve saved objects with the _bulk_get endpoint, chunk_size objects per request
+
+        Args:
+            objects: List of dicts with type and id
+            chunk_size: Number of objects asked for in one request
+
+        Returns:
+            tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+                Objects that were not found have an 'error' key in the list
+        """
+        return self._bulk('POST', "/api/saved_objects/_bulk_get", objects, chunk_size)
+
+    def bulk_update_saved_objects(self, objects, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+        """
+        Update saved objects with the _bulk_update endpoint, chunk_size objects per request
+
+        Args:
+            objects: List of dicts with type, id and the attributes to update
+            chunk_size: Number of objects sent in one request
+
+        Returns:
+            tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+                Objects that could not be updated have an 'error' key in the list
+        """
+        return self._bulk('PUT', "/api/saved_objects/_bulk_update", objects, chunk_size)
+
+    def _bulk(self, method, path, objects, chunk_size, params=None):
+        """Send objects to a bulk endpoint in chunks, return the saved_objects of all the responses."""
+        if chunk_size < 1:
+            return False, None, f"chunk_size must be at least 1, got {chunk_size}"
+        saved_objects = []
+        for start in range(0, len(objects), chunk_size):
+            success, data, error = self.call(method, path, json=objects[start:start + chunk_size], params=params)
+            if not success:
+                return False, None, error
+            saved_objects.extend(data.get('saved_objects', []))
+        return True, saved_objects, None
+
+    def wait_ready(self, attempts=30, interval=5):
+        """Wait until the dashboard answers, for at most attempts tries interval seconds apart."""
+        for i in range(attempts):
+            try:
+                response = self.session.get(self.dashboard_url, timeout=1)
+                if 200 <= response.status_code < 400:
+                    return True
+            except Exception:
+                pass
+            time.sleep(interval)
+        return False
+
+
+_clients = {}
+
+
+def get_client(dashboard_host, username, password, port=443):
+    """
+    Return the client of a dashboard, the same one for every call with the same arguments
 
     Args:
-        method: HTTP method (GET, POST, PUT, DELETE)
-        url: Full URL for the API endpoint
+        dashboard_host: Hostname or IP of the dashboard
         username: Dashboard username
         password: Dashboard password
-        **kwargs: Additional arguments passed to requests.request()
+        port: Port number (default: 443)
 
     Returns:
-        requests.Response: Response object
-
-    Raises:
-        requests.exceptions.RequestException: On connection or request errors
+        DashboardClient: Client with a pool of open connections to the dashboard
     """
-    # Ensure headers are set
-    if 'headers' not in kwargs:
-        kwargs['headers'] = get_opensearch_headers()
-
-    # Set authentication
-    kwargs['auth'] = (username, password)
-
-    # Disable SSL verification for self-signed certs
-    kwargs['verify'] = False
-
-    return requests.request(method, url, **kwargs)
+    key = (dashboard_host, port, username, password)
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = DashboardClient(dashboard_host, username, password, port)
+    return client
 
 
 def create_saved_object(dashboard_host, object_type, object_data, username, password, port=443):
@@ -79,29 +379,7 @@ def create_saved_object(dashboard_host, object_type, object_data, username, pass
     Returns:
         tuple: (success: bool, response_data: dict or None, error_message: str or None)
     """
-    dashboard_url = get_dashboard_url(dashboard_host, port)
-    url = f"{dashboard_url}/api/saved_objects/{object_type}"
-
-    try:
-        response = make_opensearch_request(
-            'POST',
-            url,
-            username,
-            password,
-            json=object_data
-        )
-
-        if response.status_code == 200:
-            return True, response.json(), None
-        else:
-            error_msg = f"Status code: {response.status_code}, Response: {response.text}"
-            return False, None, error_msg
-
-    except requests.exceptions.ConnectionError:
-        error_msg = f"Could not connect to Wazuh Dashboard at {dashboard_url}"
-        return False, None, error_msg
-    except Exception as e:
-        return False, None, str(e)
+    return get_client(dashboard_host, username, password, port).create_saved_object(object_type, object_data)
 
 
 def get_saved_object(dashboard_host, object_type, object_id, username, password, port=443):
@@ -119,28 +397,7 @@ def get_saved_object(dashboard_host, object_type, object_id, username, password,
     Returns:
         tuple: (success: bool, response_data: dict or None, error_message: str or None)
     """
-    dashboard_url = get_dashboard_url(dashboard_host, port)
-    url = f"{dashboard_url}/api/saved_objects/{object_type}/{object_id}"
-
-    try:
-        response = make_opensearch_request(
-            'GET',
-            url,
-            username,
-            password
-        )
-
-        if response.status_code == 200:
-            return True, response.json(), None
-        else:
-            error_msg = f"Status code: {response.status_code}, Response: {response.text}"
-            return False, None, error_msg
-
-    except requests.exceptions.ConnectionError:
-        error_msg = f"Could not connect to Wazuh Dashboard at {dashboard_url}"
-        return False, None, error_msg
-    except Exception as e:
-        return False, None, str(e)
+    return get_client(dashboard_host, username, password, port).get_saved_object(object_type, object_id)
 
 
 def update_saved_object(dashboard_host, object_type, object_id, object_data, username, password, port=443):
@@ -159,29 +416,7 @@ def update_saved_object(dashboard_host, object_type, object_id, object_data, use
     Returns:
         tuple: (success: bool, response_data: dict or None, error_message: str or None)
     """
-    dashboard_url = get_dashboard_url(dashboard_host, port)
-    url = f"{dashboard_url}/api/saved_objects/{object_type}/{object_id}"
-
-    try:
-        response = make_opensearch_request(
-            'PUT',
-            url,
-            username,
-            password,
-            json=object_data
-        )
-
-        if response.status_code == 200:
-            return True, response.json(), None
-        else:
-            error_msg = f"Status code: {response.status_code}, Response: {response.text}"
-            return False, None, error_msg
-
-    except requests.exceptions.ConnectionError:
-        error_msg = f"Could not connect to Wazuh Dashboard at {dashboard_url}"
-        return False, None, error_msg
-    except Exception as e:
-        return False, None, str(e)
+    return get_client(dashboard_host, username, password, port).update_saved_object(object_type, object_id, object_data)
 
 
 def delete_saved_object(dashboard_host, object_type, object_id, username, password, port=443):
@@ -199,41 +434,51 @@ def delete_saved_object(dashboard_host, object_type, object_id, username, passwo
     Returns:
         tuple: (success: bool, response_data: dict or None, error_message: str or None)
     """
-    dashboard_url = get_dashboard_url(dashboard_host, port)
-    url = f"{dashboard_url}/api/saved_objects/{object_type}/{object_id}"
-
-    try:
-        response = make_opensearch_request(
-            'DELETE',
-            url,
-            username,
-            password
-        )
-
-        if response.status_code == 200:
-            return True, response.json(), None
-        else:
-            error_msg = f"Status code: {response.status_code}, Response: {response.text}"
-            return False, None, error_msg
+    return get_client(dashboard_host, username, password, port).delete_saved_object(object_type, object_id)
 
-    except requests.exceptions.ConnectionError:
-        error_msg = f"Could not connect to Wazuh Dashboard at {dashboard_url}"
-        return False, None, error_msg
-    except Exception as e:
-        return False, None, str(e)
+def wait_dashboard_ready(dashboard_host, port=443, username=None, password=None):
+    """
+    Wait until the dashboard answers, through the client of get_client
 
-def wait_dashboard_ready(dashboard_host, port=443):
-    url = get_dashboard_url(dashboard_host, port)
-    for i in range(30):
-        try:
-            response = requests.get(url, timeout=1, verify=False)
-            if 200 <= response.status_code < 400:
-                break
-        except:
-            pass
-        time.sleep(5)
-
-def find_saved_objects(dashboard_host, object_type, search_term=None, username=None, password=None, port=443):
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        port: Port number (default: 443)
+        username: Dashboard username, pass the one of the other calls to share their connections
+        password: Dashboard password
+
+    Returns:
+        bool: True if the dashboard answered
+    """
+    return get_client(dashboard_host, username, password, port).wait_ready()
+
+
+def iter_saved_objects(dashboard_host, object_type, search_term=None, username=None, password=None, port=443,
+                       fields=None, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Find saved objects in OpenSearch Dashboards, one page per request as they are consumed
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+        search_term: Optional search term to filter by title
+        username: Dashboard username
+        password: Dashboard password
+        port: Port number (default: 443)
+        fields: Optional list of attributes to return (e.g., ['title']), all of them by default
+        per_page: Number of objects asked for in one request (default: DEFAULT_PAGE_SIZE)
+
+    Yields:
+        dict: Saved objects
+
+    Raises:
+        DashboardApiError: If a request fails
+    """
+    return get_client(dashboard_host, username, password, port).iter_saved_objects(
+        object_type, search_term, fields, per_page)
+
+
+def find_saved_objects(dashboard_host, object_type, search_term=None, username=None, password=None, port=443,
+                       fields=None):
     """
     Find saved objects in OpenSearch Dashboards
 
@@ -244,41 +489,84 @@ def find_saved_objects(dashboard_host, object_type, search_term=None, username=N
         username: Dashboard username
         password: Dashboard password
         port: Port number (default: 443)
+        fields: Optional list of attributes to return (e.g., ['title']), all of them by default
 
     Returns:
         tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
     """
-    dashboard_url = get_dashboard_url(dashboard_host, port)
-    url = f"{dashboard_url}/api/saved_objects/_find"
+    return get_client(dashboard_host, username, password, port).find_saved_objects(object_type, search_term, fields)
 
-    # Build query parameters
-    params = {
-        'type': object_type,
-        'per_page': 10000  # Set high to get all results
-    }
 
-    if search_term:
-        params['search'] = search_term
-        params['search_fields'] = 'title'
-
-    try:
-        response = make_opensearch_request(
-            'GET',
-            url,
-            username,
-            password,
-            params=params
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            return True, data.get('saved_objects', []), None
-        else:
-            error_msg = f"Status code: {response.status_code}, Response: {response.text}"
-            return False, None, error_msg
+def find_saved_object_by_title(dashboard_host, object_type, title, username, password, port=443, fields=None):
+    """
+    Find the first saved object in OpenSearch Dashboards with exactly this title
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        object_type: Type of saved object (e.g., 'search', 'visualization', 'dashboard')
+        title: Title of the object
+        username: Dashboard username
+        password: Dashboard password
+        port: Port number (default: 443)
+        fields: Optional list of attributes to return, the title is always included
+
+    Returns:
+        tuple: (success: bool, saved_object: dict or None if not found, error_message: str or None)
+    """
+    return get_client(dashboard_host, username, password, port).find_saved_object_by_title(object_type, title, fields)
+
+
+def bulk_create_saved_objects(dashboard_host, objects, username, password, port=443, overwrite=False,
+                              chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """
+    Create saved objects in OpenSearch Dashboards, chunk_size objects per request
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        objects: List of dicts with type, attributes and optionally id and references
+        username: Dashboard username
+        password: Dashboard password
+        port: Port number (default: 443)
+        overwrite: Replace the objects whose id already exists instead of failing on them
+        chunk_size: Number of objects sent in one request (default: DEFAULT_BULK_CHUNK_SIZE)
+
+    Returns:
+        tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+    """
+    return get_client(dashboard_host, username, password, port).bulk_create_saved_objects(objects, overwrite, chunk_size)
+
+
+def bulk_get_saved_objects(dashboard_host, objects, username, password, port=443, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """
+    Retrieve saved objects from OpenSearch Dashboards, chunk_size objects per request
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        objects: List of dicts with type and id
+        username: Dashboard username
+        password: Dashboard password
+        port: Port number (default: 443)
+        chunk_size: Number of objects asked for in one request (default: DEFAULT_BULK_CHUNK_SIZE)
 
-    except requests.exceptions.ConnectionError:
-        error_msg = f"Could not connect to Wazuh Dashboard at {dashboard_url}"
-        return False, None, error_msg
-    except Exception as e:
-        return False, None, str(e)
+    Returns:
+        tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+    """
+    return get_client(dashboard_host, username, password, port).bulk_get_saved_objects(objects, chunk_size)
+
+
+def bulk_update_saved_objects(dashboard_host, objects, username, password, port=443, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """
+    Update saved objects in OpenSearch Dashboards, chunk_size objects per request
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        objects: List of dicts with type, id and the attributes to update
+        username: Dashboard username
+        password: Dashboard password
+        port: Port number (default: 443)
+        chunk_size: Number of objects sent in one request (default: DEFAULT_BULK_CHUNK_SIZE)
+
+    Returns:
+        tuple: (success: bool, saved_objects_list: list or None, error_message: str or None)
+    """
+    return get_client(dashboard_host, username, password, port).bulk_update_saved_objects(objects, chunk_size)
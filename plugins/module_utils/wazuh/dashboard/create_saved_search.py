@@ -1,17 +1,21 @@
 """
 Script to create a Wazuh Saved Search using OpenSearch Dashboards API
 """
-import json, sys, re, os
+import json, sys, re, os, uuid
 import importlib.util
 from pathlib import Path
 module_path = Path(__file__).parent / "utils" / "helpers.py"
 
 # print(__file__)  # Commented out - breaks Ansible module JSON output
-from .api import create_saved_object, find_saved_objects, update_saved_object, wait_dashboard_ready
+from .api import get_client, DashboardApiError, DEFAULT_BULK_CHUNK_SIZE
 
 # Default configuration
 INDEX_PATTERN_ID = "wazuh-alerts-*"  # Default Wazuh index pattern
 
+# Namespace of the uuid5 ids derived from saved search titles, never change it:
+# searches created with the old ids would no longer be found
+SAVED_SEARCH_ID_NAMESPACE = uuid.UUID("50e5f913-ea48-48ba-892b-60546ea57ae1")
+
 def parse_filter_string(filter_string):
     """
     Parse a simple filter string into OpenSearch filter objects
@@ -73,22 +77,19 @@ def parse_filter_string(filter_string):
 
     return filters
 
-def create_saved_search(dashboard_host, username, password, saved_search_title, filter=None, columns=None, description=None, port=443):
+def build_saved_search_object(saved_search_title, filter=None, columns=None, description=None):
     """
-    Create or update a saved search in OpenSearch Dashboards
+    Build the saved object of a saved search
 
     Args:
-        dashboard_host: Hostname or IP of the dashboard
-        username: Dashboard username
-        password: Dashboard password
         saved_search_title: Title for the saved search
-        filter: Simple filter string (e.g., 'agent.name:Mac-mini.local and not rule.groups:authentication_failed')
-                If None, no filters are applied (default: None)
+        filter: Simple filter string, see parse_filter_string (default: None, no filters)
         columns: List of columns to display (default: ["timestamp", "agent.name", "rule.description", "rule.level", "rule.id"])
         description: Description for the saved search (default: uses saved_search_title)
-        port: Port number (default: 443)
+
+    Returns:
+        dict: Saved object with its attributes
     """
-    # print(f"dashboard_host = {dashboard_host}, username = {username}, password = {password}")
     # Set default columns if not provided
     if columns is None:
         columns = ["timestamp", "agent.name", "rule.description", "rule.level", "rule.id"]
@@ -97,15 +98,11 @@ def create_saved_search(dashboard_host, username, password, saved_search_title,
     if description is None:
         description = saved_search_title
 
-    # print(f"Creating saved search on Wazuh Dashboard. Title: {saved_search_title}")
-    # if filter:
-    #     print(f"Filter: {filter}")
-
     # Parse filter string into filter objects
     filter_objects = parse_filter_string(filter) if filter else []
 
     # Saved search object
-    saved_search_object = {
+    return {
         "attributes": {
             "title": saved_search_title,
             "description": description,
@@ -127,68 +124,312 @@ def create_saved_search(dashboard_host, username, password, saved_search_title,
         }
     }
 
-    wait_dashboard_ready(
-        dashboard_host=dashboard_host,
-        port=port
-    )
+
+def create_saved_search(dashboard_host, username, password, saved_search_title, filter=None, columns=None, description=None, port=443):
+    """
+    Create or update a saved search in OpenSearch Dashboards
+
+    The search is looked up once by title, then created, updated or left as it is if its
+    stored attributes already match.
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        username: Dashboard username
+        password: Dashboard password
+        saved_search_title: Title for the saved search
+        filter: Simple filter string (e.g., 'agent.name:Mac-mini.local and not rule.groups:authentication_failed')
+                If None, no filters are applied (default: None)
+        columns: List of columns to display (default: ["timestamp", "agent.name", "rule.description", "rule.level", "rule.id"])
+        description: Description for the saved search (default: uses saved_search_title)
+        port: Port number (default: 443)
+
+    Returns:
+        dict: Title, id and action ('created', 'updated' or 'unchanged') of the saved search
+    """
+    # print(f"dashboard_host = {dashboard_host}, username = {username}, password = {password}")
+    # print(f"Creating saved search on Wazuh Dashboard. Title: {saved_search_title}")
+    # if filter:
+    #     print(f"Filter: {filter}")
+    saved_search_object = build_saved_search_object(saved_search_title, filter, columns, description)
+
+    # Every request below goes through the same pooled connections
+    client = get_client(dashboard_host, username, password, port)
+
+    client.wait_ready()
 
     # Check if a saved search with this title already exists
     # print(f"Checking for existing saved searches with title: {saved_search_title}")
-    find_success, existing_objects, find_error = find_saved_objects(
-        dashboard_host=dashboard_host,
+    # Only the attributes compared below are fetched, and only until the first exact match
+    find_success, existing_object, find_error = client.find_saved_object_by_title(
         object_type='search',
-        search_term=saved_search_title,
-        username=username,
-        password=password,
-        port=port
+        title=saved_search_title,
+        fields=list(saved_search_object['attributes'])
     )
-
-    existing_object_id = None
-    if find_success and existing_objects:
-        # Filter to exact title match (search might return partial matches)
-        exact_matches = [obj for obj in existing_objects
-                        if obj.get('attributes', {}).get('title') == saved_search_title]
-
-        if exact_matches:
-            # Use the first exact match
-            existing_object_id = exact_matches[0].get('id')
-            # print(f"Found existing saved search with ID: {existing_object_id}. Updating...")
+    if not find_success:
+        raise Exception(f"Failed to find saved search: {find_error}")
 
     # Update existing saved search or create a new one
-    if existing_object_id:
-        success, result, error = update_saved_object(
-            dashboard_host=dashboard_host,
+    if existing_object:
+        existing_object_id = existing_object.get('id')
+        # print(f"Found existing saved search with ID: {existing_object_id}. Updating...")
+        if is_saved_search_unchanged(existing_object, saved_search_object):
+            return dict(title=saved_search_title, id=existing_object_id, action='unchanged')
+
+        success, result, error = client.update_saved_object(
             object_type='search',
             object_id=existing_object_id,
-            object_data=saved_search_object,
-            username=username,
-            password=password,
-            port=port
+            object_data=saved_search_object
         )
 
         if success:
             # print(f"✓ Saved search updated successfully!")
             # print(f"  ID: {result.get('id')}, title: {saved_search_title}")
-            pass
+            return dict(title=saved_search_title, id=result.get('id', existing_object_id), action='updated')
         else:
             raise Exception(f"Failed to update saved search: {error}")
     else:
-        success, result, error = create_saved_object(
-            dashboard_host=dashboard_host,
+        success, result, error = client.create_saved_object(
             object_type='search',
-            object_data=saved_search_object,
-            username=username,
-            password=password,
-            port=port
+            object_data=saved_search_object
         )
 
         if success:
             # print(f"✓ Saved search created successfully!")
             # print(f"  ID: {result.get('id')}, title: {saved_search_title}")
-            pass
+            return dict(title=saved_search_title, id=result.get('id'), action='created')
         else:
             raise Exception(f"Failed to create saved search: {error}")
 
+def is_saved_search_unchanged(existing_object, saved_search_object):
+    """
+    Check if a stored saved search already has the attributes of saved_search_object
+
+    The dashboard moves the index pattern ids of searchSourceJSON to the references of
+    the object, they are put back before comparing.
+
+    Args:
+        existing_object: Saved object as returned by the dashboard
+        saved_search_object: Saved object as built by build_saved_search_object
+
+    Returns:
+        bool: True if writing saved_search_object would change nothing
+    """
+    stored = existing_object.get('attributes', {})
+    for name, value in saved_search_object['attributes'].items():
+        if name == 'kibanaSavedObjectMeta':
+            try:
+                stored_source = json.loads(stored.get(name, {}).get('searchSourceJSON', ''))
+            except (AttributeError, TypeError, ValueError):
+                return False
+            references = {ref.get('name'): ref.get('id') for ref in existing_object.get('references', [])}
+            if _resolve_references(stored_source, references) != json.loads(value['searchSourceJSON']):
+                return False
+        elif stored.get(name) != value:
+            return False
+    return True
+
+def _resolve_references(value, references):
+    """Replace the indexRefName keys of a parsed searchSourceJSON by the index they refer to."""
+    if isinstance(value, list):
+        return [_resolve_references(item, references) for item in value]
+    if not isinstance(value, dict):
+        return value
+    resolved = {}
+    for key, item in value.items():
+        if key == 'indexRefName' and item in references:
+            resolved['index'] = references[item]
+        else:
+            resolved[key] = _resolve_references(item, references)
+    return resolved
+
+def create_saved_searches(dashboard_host, username, password, saved_searches, port=443, chunk_size=DEFAULT_BULK_CHUNK_SIZE):
+    """
+    Create or update several saved searches with a few bulk requests
+
+    The existing searches are found with one paged listing, then the missing ones are
+    created and the existing ones that differ updated, chunk_size searches per request.
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        username: Dashboard username
+        password: Dashboard password
+        saved_searches: List of dicts with title and optionally filter, columns and description,
+                        see create_saved_search
+        port: Port number (default: 443)
+        chunk_size: Number of searches sent in one request (default: DEFAULT_BULK_CHUNK_SIZE)
+
+    Returns:
+        list: One dict per saved search with its title, id and action ('created', 'updated' or 'unchanged')
+    """
+    client = get_client(dashboard_host, username, password, port)
+
+    client.wait_ready()
+
+    # Use the first object found for a title, like create_saved_search
+    existing_objects = {}
+    fields = list(build_saved_search_object('')['attributes'])
+    try:
+        for obj in client.iter_saved_objects(object_type='search', fields=fields):
+            existing_objects.setdefault(obj.get('attributes', {}).get('title'), obj)
+    except DashboardApiError as e:
+        raise Exception(f"Failed to find saved searches: {e}")
+
+    to_create = []
+    to_update = []
+    results = []
+    for saved_search in saved_searches:
+        title = saved_search['title']
+        saved_search_object = build_saved_search_object(
+            title,
+            filter=saved_search.get('filter'),
+            columns=saved_search.get('columns'),
+            description=saved_search.get('description')
+        )
+        saved_search_object['type'] = 'search'
+        existing_object = existing_objects.get(title)
+        if existing_object and is_saved_search_unchanged(existing_object, saved_search_object):
+            results.append(dict(title=title, id=existing_object.get('id'), action='unchanged'))
+        elif existing_object:
+            object_id = existing_object.get('id')
+            saved_search_object['id'] = object_id
+            to_update.append(saved_search_object)
+            results.append(dict(title=title, id=object_id, action='updated'))
+        else:
+            to_create.append(saved_search_object)
+            results.append(dict(title=title, id=None, action='created'))
+
+    if to_update:
+        success, updated, error = client.bulk_update_saved_objects(to_update, chunk_size)
+        if not success:
+            raise Exception(f"Failed to update saved searches: {error}")
+        _raise_object_errors(updated, 'update')
+
+    if to_create:
+        success, created, error = client.bulk_create_saved_objects(to_create, chunk_size=chunk_size)
+        if not success:
+            raise Exception(f"Failed to create saved searches: {error}")
+        _raise_object_errors(created, 'create')
+        # The bulk response lists the objects in the order they were sent
+        created_ids = iter(obj.get('id') for obj in created)
+        for result in results:
+            if result['action'] == 'created':
+                result['id'] = next(created_ids, None)
+
+    return results
+
+
+def saved_search_id(saved_search_title, namespace=''):
+    """
+    Return the stable id of a saved search, a uuid5 of namespace and its title
+
+    Args:
+        saved_search_title: Title of the saved search
+        namespace: Optional name separating the ids of several sets of searches with the same titles
+
+    Returns:
+        str: Saved object id
+    """
+    return str(uuid.uuid5(uuid.uuid5(SAVED_SEARCH_ID_NAMESPACE, namespace), saved_search_title))
+
+
+def upsert_saved_searches(dashboard_host, username, password, saved_searches, port=443,
+                          chunk_size=DEFAULT_BULK_CHUNK_SIZE, id_namespace='', remove_duplicates=False):
+    """
+    Create or update saved searches at ids derived from their titles, see saved_search_id
+
+    No search by title is needed, the write is a _bulk_create with overwrite, chunk_size
+    searches per request.  It is preceded by a _bulk_get of the same ids, which is only
+    there to report each search as created, updated or unchanged, and to skip writing
+    the unchanged ones so that a rerun reports no change.  With remove_duplicates, the
+    other saved searches having the title of one of them are deleted, after a paged
+    listing of the saved search titles.
+
+    Args:
+        dashboard_host: Hostname or IP of the dashboard
+        username: Dashboard username
+        password: Dashboard password
+        saved_searches: List of dicts with title and optionally filter, columns and description,
+                        see create_saved_search
+        port: Port number (default: 443)
+        chunk_size: Number of searches sent in one request (default: DEFAULT_BULK_CHUNK_SIZE)
+        id_namespace: Namespace of the ids, see saved_search_id (default: '')
+        remove_duplicates: Delete the saved searches with the same title and another id (default: False)
+
+    Returns:
+        list: One dict per saved search with its title, id and action ('created', 'updated' or 'unchanged'),
+              and with remove_duplicates the list of the deleted ids as duplicates
+    """
+    client = get_client(dashboard_host, username, password, port)
+
+    client.wait_ready()
+
+    # The last search given for a title wins, like a rewrite of the same id would
+    saved_search_objects = {}
+    for saved_search in saved_searches:
+        title = saved_search['title']
+        saved_search_object = build_saved_search_object(
+            title,
+            filter=saved_search.get('filter'),
+            columns=saved_search.get('columns'),
+            description=saved_search.get('description')
+        )
+        saved_search_object.update(type='search', id=saved_search_id(title, id_namespace))
+        saved_search_objects[title] = saved_search_object
+
+    # Only read to tell created, updated and unchanged searches apart
+    success, stored, error = client.bulk_get_saved_objects(
+        [dict(type='search', id=o['id']) for o in saved_search_objects.values()], chunk_size)
+    if not success:
+        raise Exception(f"Failed to get saved searches: {error}")
+
+    to_write = []
+    results = []
+    for saved_search_object, stored_object in zip(saved_search_objects.values(), stored):
+        title = saved_search_object['attributes']['title']
+        error = stored_object.get('error')
+        if error and error.get('statusCode') != 404:
+            raise Exception(f"Failed to get saved search {title}: {error.get('message', error)}")
+        if not error and is_saved_search_unchanged(stored_object, saved_search_object):
+            action = 'unchanged'
+        else:
+            to_write.append(saved_search_object)
+            action = 'created' if error else 'updated'
+        results.append(dict(title=title, id=saved_search_object['id'], action=action))
+
+    if to_write:
+        success, written, error = client.bulk_create_saved_objects(to_write, overwrite=True, chunk_size=chunk_size)
+        if not success:
+            raise Exception(f"Failed to write saved searches: {error}")
+        _raise_object_errors(written, 'write')
+
+    if remove_duplicates:
+        stable_ids = {r['title']: r['id'] for r in results}
+        duplicates = {r['title']: [] for r in results}
+        try:
+            for obj in client.iter_saved_objects(object_type='search', fields=['title']):
+                title = obj.get('attributes', {}).get('title')
+                if title in stable_ids and obj.get('id') != stable_ids[title]:
+                    duplicates[title].append(obj.get('id'))
+        except DashboardApiError as e:
+            raise Exception(f"Failed to find saved searches: {e}")
+        for result in results:
+            for object_id in duplicates[result['title']]:
+                success, _, error = client.delete_saved_object('search', object_id)
+                if not success:
+                    raise Exception(f"Failed to delete duplicate saved search {object_id}: {error}")
+            result['duplicates'] = duplicates[result['title']]
+
+    return results
+
+
+def _raise_object_errors(saved_objects, action):
+    """Raise an Exception listing the objects of a bulk response that failed."""
+    errors = [f"{obj.get('id') or obj.get('attributes', {}).get('title')}: {obj['error'].get('message', obj['error'])}"
+              for obj in saved_objects if obj.get('error')]
+    if errors:
+        raise Exception(f"Failed to {action} saved searches: {'; '.join(errors)}")
+
+
 if __name__ == "__main__":
     # Configuration
     args = sys.argv[1:]
@@ -8,71 +8,206 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 import sys, re, json
+from collections import namedtuple
+from functools import lru_cache
 from lxml import etree
 
+# Number of compiled XPath expressions kept between operations and files of one run
+XPATH_CACHE_SIZE = 512
 
-def split_xpath(xpath):
-    """Split xpath by '/' but not when inside predicates (square brackets)."""
-    parts = []
-    current_part = ""
+# Size of the chunks fed to the XML parser (and read from the file in streaming mode)
+CHUNK_SIZE = 1024 * 1024
+
+
+# One step of a compiled path: the original xpath part, its tag name and its predicates,
+# each a (kind, key, value) tuple where kind is 'attr' for [@key='value'], 'child' for
+# [key='value'], 'position' for [n] (key is n) or None for anything else, which is left
+# to XPath itself and ignored when looking up or creating nodes.
+XPathStep = namedtuple('XPathStep', ['part', 'tag', 'predicates'])
+
+_PREDICATE_RE = re.compile(r"""^\s*(@?)([\w.:-]+)\s*=\s*(?:'([^']+)'|"([^"]+)")\s*$""")
+_POSITION_RE = re.compile(r'^\s*([1-9][0-9]*)\s*$')
+
+
+def _parse_predicate(predicate):
+    match = _PREDICATE_RE.match(predicate)
+    if match:
+        kind = 'attr' if match.group(1) else 'child'
+        pred_value = match.group(3) if match.group(3) is not None else match.group(4)
+        return kind, match.group(2), pred_value
+    match = _POSITION_RE.match(predicate)
+    if match:
+        return 'position', int(match.group(1)), None
+    return None, predicate, None
+
+
+def compile_step(part):
+    """Compile an xpath part like "localfile[location='journald']" or "rule[@id='1'][2]"."""
+    bracket = part.find('[')
+    if bracket == -1:
+        return XPathStep(part, part, ())
+
+    predicates = []
     bracket_depth = 0
+    for i in range(bracket, len(part)):
+        if part[i] == '[':
+            if bracket_depth == 0:
+                start = i + 1
+            bracket_depth += 1
+        elif part[i] == ']':
+            bracket_depth -= 1
+            if bracket_depth == 0:
+                predicates.append(_parse_predicate(part[start:i]))
+    return XPathStep(part, part[:bracket], tuple(predicates))
+
 
-    for char in xpath:
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compile_path(xpath):
+    """Split xpath by '/' (but not inside predicates) into a tuple of compiled steps, once."""
+    steps = []
+    start = 0
+    bracket_depth = 0
+    for i, char in enumerate(xpath):
         if char == '[':
             bracket_depth += 1
-            current_part += char
         elif char == ']':
             bracket_depth -= 1
-            current_part += char
         elif char == '/' and bracket_depth == 0:
-            if current_part:
-                parts.append(current_part)
-            current_part = ""
-        else:
-            current_part += char
+            if i > start:
+                steps.append(compile_step(xpath[start:i]))
+            start = i + 1
+    if start < len(xpath):
+        steps.append(compile_step(xpath[start:]))
+    return tuple(steps)
+
+
+def split_xpath(xpath):
+    """Split xpath by '/' but not when inside predicates (square brackets)."""
+    return [step.part for step in compile_path(xpath)]
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compile_xpath(xpath):
+    """Compile xpath (already adjusted to the root wrapper) once and reuse it."""
+    return etree.XPath(xpath)
+
+
+def xpath_cache_info():
+    """Return hit/miss counters of the compiled XPath cache."""
+    info = compile_xpath.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
 
-    if current_part:
-        parts.append(current_part)
 
-    return parts
+# '&' is kept out of the XML parser's sight: Wazuh reads it literally, so bare '&' and
+# entities like '&amp;' must be written back exactly as they were.
+# str.replace returns the string itself when there is nothing to replace, so content
+# without ampersands is not copied.
+AMP_SUBST = '--AMP-SYMBOL-SUBST--'
 
 def convert_xml_content(buf):
-    return re.sub('&', '--AMP-SYMBOL-SUBST--', buf)
+    return buf.replace('&', AMP_SUBST)
 
 def convert_xml_content_back(buf):
-    return re.sub('--AMP-SYMBOL-SUBST--', '&', buf)
+    return buf.replace(AMP_SUBST, '&')
+
+
+def find_deepest_existing(root, steps, max_depth=None, child_index=None):
+    """Find the nodes matched by the longest existing prefix of compiled xpath steps.
+
+    The first step is matched from the document node, every next step only against
+    the nodes matched by the previous ones, so the lookup walks the path once instead
+    of running a full document query per prefix.
+    Returns (nodes, depth) where depth is the number of matched steps, or ([], 0).
+    """
+    if child_index is None:
+        child_index = {}
+    found_nodes = []
+    found_depth = 0
+    nodes = None
+
+    for i, step in enumerate(steps[:max_depth]):
+        if nodes is None:
+            nodes = compile_xpath('/' + step.part)(root)
+        else:
+            nodes = [match for node in nodes for match in _select_children(node, step, child_index)]
+        nodes = [node for node in nodes if isinstance(node, etree._Element)]
+        if not nodes:
+            break
+        found_nodes = nodes
+        found_depth = i + 1
 
+    return found_nodes, found_depth
 
 
-def extract_tag_name(xpath_part):
-    """Extract tag name from xpath part, removing predicates."""
-    # Remove predicates like [location=journald]
-    match = re.match(r'^([^\[]+)', xpath_part)
-    if match:
-        return match.group(1)
-    return xpath_part
+# Indentation libxml2 uses when pretty printing (two spaces per level, capped at 30 levels)
+_INDENT_UNIT = '  '
+_INDENT_MAX_LEVEL = 30
 
 
-def parse_predicate(xpath_part):
-    """Parse predicate from xpath part like 'localfile[@location='journald']' or 'integration[name='test']'
-    Returns (tag_name, predicate_type, predicate_dict) where predicate_type is 'attr' or 'child' or None"""
-    # Match predicates with @ (attribute) or without (child element)
-    match = re.match(r'^([^\[]+)(?:\[(@?)([^=]+)=\'([^\']+)\'\])?', xpath_part)
-    if match:
-        tag_name = match.group(1)
-        if match.group(2) is not None and match.group(3) and match.group(4):
-            # Has predicate
-            has_at_sign = match.group(2) == '@'
-            pred_name = match.group(3)
-            pred_value = match.group(4)
-            predicate_type = 'attr' if has_at_sign else 'child'
-            return tag_name, predicate_type, {pred_name: pred_value}
-        return tag_name, None, None
-    return xpath_part, None, None
+def _indent(level):
+    return '\n' + _INDENT_UNIT * min(level, _INDENT_MAX_LEVEL)
 
 
-def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_block=None, xml_set_raw=None, when_xpath_exist=None):
+def parse_document(xml_content, chunk_size=CHUNK_SIZE):
+    """Parse OSSEC config content (a list of top level nodes) wrapped in a 'root' node.
+
+    Content is fed to the parser in chunks, so the wrapped, substituted and encoded
+    copies of the whole document are never built.
+    """
+    parser = etree.XMLParser()
+    parser.feed(b'<root>')
+    for start in range(0, len(xml_content), chunk_size):
+        parser.feed(convert_xml_content(xml_content[start:start + chunk_size]).encode('utf-8'))
+    parser.feed(b'</root>')
+    return parser.close()
 
+
+def serialize_node(node):
+    """Serialize one top level node the way serialize_document does."""
+    # subst. & symbol
+    return convert_xml_content_back(etree.tostring(node, encoding='unicode', pretty_print=True).rstrip())
+
+
+def serialize_document(root):
+    """Return XML as string (without root node and xml declaration)."""
+    return '\n'.join(serialize_node(child) for child in root)
+
+
+def _reformat(element, level):
+    """Add the whitespace pretty printing would add to an element without text nodes."""
+    if len(element) == 0 or element.text is not None:
+        return
+    for child in element:
+        if child.tail is not None:
+            return
+
+    element.text = _indent(level + 1)
+    for child in element:
+        child.tail = _indent(level + 1)
+        if isinstance(child.tag, str):
+            _reformat(child, level + 1)
+    element[-1].tail = _indent(level)
+
+
+def normalize_document(root):
+    """Bring a modified tree to the state parse_document(serialize_document(root)) would return.
+
+    Lets a task_block apply its operations to one in-memory tree and still produce
+    exactly what re-parsing the document after every operation would produce.
+    """
+    root.text = None
+    last = len(root) - 1
+    for i, child in enumerate(root):
+        tail = child.tail.rstrip() if child.tail else ''
+        if i < last:
+            child.tail = tail + '\n'
+        else:
+            child.tail = tail or None
+        if isinstance(child.tag, str):
+            _reformat(child, 0)
+
+
+def _prepare_operation(xpath=None, value=None, attributes=None, xml_set_raw=None, when_xpath_exist=None):
     # in ansible we pass empty string instead of None
     if xpath == '':
         xpath = None
@@ -80,35 +215,371 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
         value = None
     if attributes == '':
         attributes = None
-    if task_block == '':
-        task_block = None
     if xml_set_raw == '':
         xml_set_raw = None
     if when_xpath_exist == '':
         when_xpath_exist = None
     if attributes is not None and isinstance(attributes, str):
         attributes = json.loads(attributes)
-    # If task_block is provided, apply each operation in sequence
-    if task_block is not None:
-        result = xml_content
-        for operation in task_block:
-            op_xpath = operation.get('xpath')
-            op_value = operation.get('value', None)
-            op_attributes = operation.get('attributes', None)
-            op_set_raw = operation.get('xml_set_raw', None)
-            op_when_xpath_exist = operation.get('when_xpath_exist', None)
-            result = ossconf_edit(result, op_xpath, op_value, op_attributes, xml_set_raw=op_set_raw, when_xpath_exist=op_when_xpath_exist)
-        return result
-
-    # Single operation mode
     if xpath is None:
         raise ValueError("xpath is required when task_block is not provided")
+    return xpath, value, attributes, xml_set_raw, when_xpath_exist
+
 
-    # Wrap provided XML in 'root' node
-    wrapped_xml = convert_xml_content('<root>' + xml_content + '</root>')
+def _collect_operations(xpath=None, value=None, attributes=None, task_block=None, xml_set_raw=None, when_xpath_exist=None):
+    """Return the list of prepared operations for ossconf_edit arguments."""
+    if task_block == '':
+        task_block = None
+
+    # If task_block is provided, apply each operation in sequence
+    if task_block is not None:
+        operations = [
+            (operation.get('xpath'), operation.get('value', None), operation.get('attributes', None),
+             operation.get('xml_set_raw', None), operation.get('when_xpath_exist', None))
+            for operation in task_block
+        ]
+    else:
+        # Single operation mode
+        operations = [(xpath, value, attributes, xml_set_raw, when_xpath_exist)]
+
+    return [_prepare_operation(*operation) for operation in operations]
+
+
+def apply_operations(root, operations):
+    """Apply prepared operations in sequence to one parsed document.
+
+    Returns False if none of them modified the document.
+    """
+    # Normalizing only touches whitespace around elements with children, so the
+    # lookup index stays valid for the whole sequence
+    child_index = {}
+    changed = False
+    dirty = False
+    for operation in operations:
+        if dirty:
+            # Give the next operation the tree it would get from re-parsing the result so far
+            normalize_document(root)
+        dirty = apply_operation(root, *operation, child_index=child_index)
+        changed = changed or dirty
+    return changed
+
+
+def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_block=None, xml_set_raw=None, when_xpath_exist=None):
+
+    operations = _collect_operations(xpath, value, attributes, task_block, xml_set_raw, when_xpath_exist)
+    if not operations:
+        return xml_content
+
+    # Parse once and apply every operation to the same tree
+    root = parse_document(xml_content)
+
+    # If no operation modified the document, return the original XML itself, unchanged
+    # and without serializing it
+    if not apply_operations(root, operations):
+        return xml_content
+
+    return serialize_document(root)
+
+
+def iter_top_level_nodes(path, chunk_size=CHUNK_SIZE):
+    """Parse the file at path incrementally and yield its top level nodes one by one.
+
+    A node is yielded once it is complete, including its tail, and is dropped from the
+    parsed tree afterwards (unless the caller moved it elsewhere), so only the node
+    being handled and one read chunk are held in memory.
+    """
+    # Only the start of the wrapper is reported, the tree itself is built as data comes in
+    parser = etree.XMLPullParser(events=('start',), tag='root')
+    parser.feed(b'<root>')
+    root = None
 
-    # Parse XML with lxml
-    root = etree.fromstring(wrapped_xml.encode('utf-8'))
+    with open(path, 'r') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk:
+                parser.feed(convert_xml_content(chunk).encode('utf-8'))
+            else:
+                parser.feed(b'</root>')
+            if root is None:
+                for _, root in parser.read_events():
+                    break
+                if root is None:
+                    continue
+
+            # Every top level node but the last one is complete (its tail is followed by
+            # the next node); at the end of the file the last one is complete too
+            complete = len(root) - 1 if chunk else len(root)
+            for _ in range(complete):
+                node = root[0]
+                yield node
+                if node.getparent() is root:
+                    root.remove(node)
+
+            if not chunk:
+                parser.close()
+                return
+
+
+def _stream_anchor(xpath):
+    """Compile the test telling if a top level node can be reached by xpath in streaming mode."""
+    if not xpath.startswith('/') or xpath.startswith('//'):
+        raise ValueError(f"streaming mode requires absolute xpaths starting with a node name, got '{xpath}'")
+    steps = compile_path(xpath)
+    for step in steps:
+        if '::' in step.tag or step.tag.startswith('.') or step.tag.startswith('@') or '(' in step.tag:
+            raise ValueError(f"streaming mode supports only child element steps, got '{step.part}' in '{xpath}'")
+
+    # Predicates that only look at the node itself select the same nodes whatever the
+    # siblings are, others (like positions) need every node with that name to be kept
+    first = steps[0]
+    if all(kind in ('attr', 'child') for kind, key, pred_value in first.predicates):
+        return compile_xpath('self::' + first.part)
+    return compile_xpath('self::' + first.tag)
+
+
+def ossconf_edit_stream(source_path, destination, xpath=None, value=None, attributes=None, task_block=None, xml_set_raw=None, when_xpath_exist=None):
+    """Streaming variant of ossconf_edit for very large files (e.g. merged rule files).
+
+    The file at source_path is read twice with an incremental parser.  The first pass
+    keeps only the top level nodes the operations can reach (decided by the first step
+    of each xpath), the operations are applied to those, and the second pass writes
+    the result to the destination file object, copying every other top level node
+    through one at a time.  Output is the same as ossconf_edit would return.
+    Every xpath must be absolute and use child element steps only.
+
+    Returns False (and writes nothing) if no operation modified the document.
+    """
+    operations = _collect_operations(xpath, value, attributes, task_block, xml_set_raw, when_xpath_exist)
+    if not operations:
+        return False
+
+    anchors = [
+        _stream_anchor(operation_xpath)
+        for operation in operations
+        for operation_xpath in (operation[0], operation[4])
+        if operation_xpath is not None
+    ]
+
+    # First pass: collect reachable top level nodes, in document order
+    root = etree.Element('root')
+    kept_positions = set()
+    for position, node in enumerate(iter_top_level_nodes(source_path)):
+        if isinstance(node.tag, str) and any(anchor(node) for anchor in anchors):
+            root.append(node)
+            kept_positions.add(position)
+
+    if not apply_operations(root, operations):
+        return False
+
+    # Second pass: write edited nodes in place of the kept ones, copy the others.
+    # Operations only replace top level nodes in place or append new ones at the end.
+    edited_nodes = iter(list(root))
+    separator = ''
+    for position, node in enumerate(iter_top_level_nodes(source_path)):
+        if position in kept_positions:
+            node = next(edited_nodes)
+        destination.write(separator)
+        destination.write(serialize_node(node))
+        separator = '\n'
+    for node in edited_nodes:
+        destination.write(separator)
+        destination.write(serialize_node(node))
+        separator = '\n'
+
+    return True
+
+
+# Lookups of children by a single [@key='value'] or [key='value'] predicate go through
+# a per parse index: parent -> (tag, kind, key) -> (value -> children in document order,
+# child -> its values).  Entries are built on first use and updated by the helpers below
+# as operations set texts and attributes or insert nodes.  An entry is None when some
+# key child is not a plain text node, such lookups are left to XPath.
+_NAME_RE = re.compile(r'^[^\W\d][\w.-]*$')
+
+
+@lru_cache(maxsize=XPATH_CACHE_SIZE)
+def _is_plain_path(xpath):
+    """Tell if xpath (adjusted to the root wrapper) is '/root' followed by child element steps."""
+    steps = compile_path(xpath)
+    return (
+        xpath.startswith('/root/') and '//' not in xpath and not xpath.endswith('/')
+        and steps[0].part == 'root' and all(_NAME_RE.match(step.tag) for step in steps)
+    )
+
+
+def _index_values(element, kind, key):
+    """Return the values element has for a predicate key, or None if they can't be indexed."""
+    if kind == 'attr':
+        attr_value = element.get(key)
+        return () if attr_value is None else (attr_value,)
+    values = []
+    for key_child in element.iterchildren(key):
+        if len(key_child):
+            return None
+        values.append(key_child.text or '')
+    return tuple(dict.fromkeys(values))
+
+
+def _index_entry(child_index, parent, tag, kind, key):
+    entries = child_index.setdefault(parent, {})
+    entry_key = (tag, kind, key)
+    if entry_key not in entries:
+        by_value = {}
+        values_of = {}
+        entry = (by_value, values_of)
+        for child in parent.iterchildren(tag):
+            values = _index_values(child, kind, key)
+            if values is None:
+                entry = None
+                break
+            values_of[child] = values
+            for child_value in values:
+                by_value.setdefault(child_value, []).append(child)
+        entries[entry_key] = entry
+    return entries[entry_key]
+
+
+def _reindex(child_index, parent, element):
+    """Update the index entries of parent after element (one of its children) was added or changed."""
+    entries = child_index.get(parent) if parent is not None else None
+    if not entries:
+        return
+    for entry_key, entry in entries.items():
+        tag, kind, key = entry_key
+        if entry is None or element.tag != tag:
+            continue
+        by_value, values_of = entry
+        old_values = values_of.get(element, ())
+        new_values = _index_values(element, kind, key)
+        if new_values is None:
+            entries[entry_key] = None
+            continue
+        if new_values == old_values:
+            continue
+        for old_value in old_values:
+            by_value[old_value].remove(element)
+        for new_value in new_values:
+            nodes = by_value.setdefault(new_value, [])
+            nodes.append(element)
+            if len(nodes) > 1 and element.getnext() is not None:
+                nodes.sort(key=parent.index)
+        values_of[element] = new_values
+
+
+def _reindex_content(child_index, element):
+    """Update the index entries that depend on element after children were added under it.
+
+    element is a key child of its parent, whose entry in the grandparent is refused once
+    element has child elements, and it has new key children for the entries of its parent.
+    """
+    parent = element.getparent()
+    if parent is not None:
+        _reindex(child_index, parent.getparent(), parent)
+        _reindex(child_index, parent, element)
+
+
+def _forget(child_index, parent, tag):
+    """Drop the index entries of parent for children with tag."""
+    entries = child_index.get(parent)
+    if entries:
+        for entry_key in [entry_key for entry_key in entries if entry_key[0] == tag]:
+            del entries[entry_key]
+
+
+def _select_children(parent, step, child_index):
+    """Return the children of parent matching a compiled step, in document order."""
+    if _NAME_RE.match(step.tag):
+        if not step.predicates:
+            return parent.findall(step.tag)
+        if len(step.predicates) == 1:
+            kind, key, pred_value = step.predicates[0]
+            if kind in ('attr', 'child') and _NAME_RE.match(key):
+                entry = _index_entry(child_index, parent, step.tag, kind, key)
+                if entry is not None:
+                    return list(entry[0].get(pred_value, ()))
+    return compile_xpath(step.part)(parent)
+
+
+def select_nodes(root, xpath, child_index):
+    """Evaluate xpath (adjusted to the root wrapper), walking plain paths through the index."""
+    if not _is_plain_path(xpath):
+        return compile_xpath(xpath)(root)
+    nodes = [root]
+    for step in compile_path(xpath)[1:]:
+        nodes = [child for node in nodes for child in _select_children(node, step, child_index)]
+        if not nodes:
+            break
+    return nodes
+
+
+def _set_text(element, value, child_index):
+    """Set element text, return True if it was different."""
+    if element.text == value:
+        return False
+    element.text = value
+    parent = element.getparent()
+    if parent is not None:
+        _reindex(child_index, parent.getparent(), parent)
+    return True
+
+
+def _set_attributes(element, attributes, child_index):
+    """Set element attributes, return True if any of them was different."""
+    changed = False
+    for attr_name, attr_value in attributes.items():
+        if element.get(attr_name) != attr_value:
+            element.set(attr_name, attr_value)
+            changed = True
+    if changed:
+        _reindex(child_index, element.getparent(), element)
+    return changed
+
+
+def _find_child(parent, step, child_index):
+    """Return the first child of parent matching a compiled step, or None."""
+    if not step.predicates:
+        return parent.find(step.tag)
+    children = _select_children(parent, step, child_index)
+    return children[0] if children else None
+
+
+def _create_child(parent, step, intermediate, child_index):
+    """Append a new child for a compiled step, with the attributes its predicates require.
+
+    Child element predicates are only created for intermediate nodes, on the target
+    node the predicate is what the operation is about to set.
+    """
+    element = etree.SubElement(parent, step.tag)
+    for kind, key, pred_value in step.predicates:
+        if kind == 'attr':
+            element.set(key, pred_value)
+        elif kind == 'child' and intermediate:
+            etree.SubElement(element, key).text = pred_value
+    _reindex(child_index, parent, element)
+    _reindex_content(child_index, parent)
+    return element
+
+
+def _same_node(node, new_node):
+    """Check if replacing node with new_node (which has no tail) would not change the output."""
+    if node.getparent().getparent() is None:
+        # Top level tails only matter for their non whitespace part
+        same_tail = not (node.tail or '').strip()
+    else:
+        same_tail = node.tail is None
+    return same_tail and etree.tostring(node, with_tail=False) == etree.tostring(new_node)
+
+
+def apply_operation(root, xpath, value=None, attributes=None, xml_set_raw=None, when_xpath_exist=None, child_index=None):
+    """Apply a single operation to a parsed document.
+
+    child_index is the lookup index of the document, shared by the operations applied
+    to it (see _select_children).
+    Returns True if the document was modified, False if the operation was skipped
+    because when_xpath_exist did not match or found everything already in place.
+    """
+    if child_index is None:
+        child_index = {}
 
     # Check if when_xpath_exist is provided and if the xpath exists
     if when_xpath_exist is not None:
@@ -119,11 +590,11 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
             check_xpath = when_xpath_exist
 
         # Check if the xpath exists
-        matching_nodes = root.xpath(check_xpath)
+        matching_nodes = select_nodes(root, check_xpath, child_index)
 
-        # If the xpath doesn't exist, return the original XML unchanged
+        # If the xpath doesn't exist, leave the document unchanged
         if not matching_nodes:
-            return xml_content
+            return False
 
     # Handle xml_set_raw - completely replace the targeted node(s) with raw XML
     if xml_set_raw is not None:
@@ -142,31 +613,27 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
             full_xpath = xpath
 
         # Find existing nodes matching the xpath
-        matching_nodes = root.xpath(full_xpath)
+        matching_nodes = select_nodes(root, full_xpath, child_index)
 
         if matching_nodes:
+            # Nothing to do if the node is already exactly the raw XML
+            if _same_node(matching_nodes[0], raw_element):
+                return False
+
             # Replace the first matching node
             parent = matching_nodes[0].getparent()
             index = list(parent).index(matching_nodes[0])
             parent.remove(matching_nodes[0])
             parent.insert(index, raw_element)
+            _forget(child_index, parent, matching_nodes[0].tag)
+            _forget(child_index, parent, raw_element.tag)
         else:
             # Node doesn't exist, need to create it
             # Split xpath to find where to insert
-            parts = split_xpath(full_xpath)
+            steps = compile_path(full_xpath)
 
             # Find the deepest existing parent
-            parent_nodes = []
-            parent_index = 0
-
-            for i in range(len(parts), 0, -1):
-                test_xpath = '/' + '/'.join(parts[:i])
-                test_nodes = root.xpath(test_xpath)
-
-                if test_nodes:
-                    parent_nodes = test_nodes
-                    parent_index = i
-                    break
+            parent_nodes, parent_index = find_deepest_existing(root, steps, child_index=child_index)
 
             # If no parent found, use root
             if not parent_nodes:
@@ -176,10 +643,10 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
             # We only insert at the first matching parent
             parent = parent_nodes[0]
             parent.append(raw_element)
+            _reindex(child_index, parent, raw_element)
+        _reindex_content(child_index, parent)
 
-        # Return XML as UTF-8 string (without root node and xml declaration)
-        result_parts = [etree.tostring(child, encoding='utf-8', pretty_print=True).decode('utf-8').rstrip() for child in root]
-        return convert_xml_content_back('\n'.join(result_parts))
+        return True
 
     # Open node with xpath and set value to value
     # Adjust xpath to account for root wrapper
@@ -188,41 +655,29 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
     else:
         full_xpath = xpath
 
-    # Split xpath into parts to understand what we're trying to set
-    parts = split_xpath(full_xpath)
+    # Split xpath into steps to understand what we're trying to set
+    steps = compile_path(full_xpath)
 
     # Find the parent path (all but the last element)
-    if len(parts) > 1:
-        parent_xpath = '/' + '/'.join(parts[:-1])
-        target_part = parts[-1]
+    if len(steps) > 1:
+        parent_xpath = '/' + '/'.join(step.part for step in steps[:-1])
+        target_step = steps[-1]
     else:
         parent_xpath = None
-        target_part = parts[0] if parts else None
+        target_step = steps[0] if steps else None
 
     # Find all parent nodes where we should set/update the target
     if parent_xpath:
-        parent_nodes = root.xpath(parent_xpath)
+        parent_nodes = select_nodes(root, parent_xpath, child_index)
     else:
         parent_nodes = [root]
 
+    changed = False
+
     if not parent_nodes:
         # No parent nodes exist, need to create the full path
-        # Find the deepest existing parent
-        parent_nodes = []
-        parent_index = 0
-
-        # Start from less specific (beginning) and go to more specific (end)
-        for i in range(1, len(parts)):
-            test_xpath = '/' + '/'.join(parts[:i])
-            test_nodes = root.xpath(test_xpath)
-
-            if test_nodes:
-                # Nodes found at this level
-                parent_nodes = test_nodes
-                parent_index = i
-            else:
-                # No nodes found, stop here
-                break
+        # Find the deepest existing parent (the target's own level is known to be missing)
+        parent_nodes, parent_index = find_deepest_existing(root, steps, len(steps) - 1, child_index)
 
         # If no parent found, start from root
         if not parent_nodes:
@@ -233,123 +688,48 @@ def ossconf_edit(xml_content, xpath=None, value=None, attributes=None, task_bloc
         for parent in parent_nodes:
             current = parent
             # Create all remaining levels
-            for i in range(parent_index, len(parts)):
-                tag_name, predicate_type, predicate = parse_predicate(parts[i])
+            for i in range(parent_index, len(steps)):
+                is_target = i == len(steps) - 1
 
                 # Check if child already exists (for both intermediate and final nodes)
-                existing_child = None
-                if predicate:
-                    # Has predicate, need to find matching child
-                    if predicate_type == 'attr':
-                        # Attribute predicate
-                        matching_children = [
-                            child for child in current.findall(tag_name)
-                            if all(child.get(k) == v for k, v in predicate.items())
-                        ]
-                        if matching_children:
-                            existing_child = matching_children[0]
-                    else:
-                        # Child element predicate
-                        matching_children = [
-                            child for child in current.findall(tag_name)
-                            if all(
-                                child.find(k) is not None and child.find(k).text == v
-                                for k, v in predicate.items()
-                            )
-                        ]
-                        if matching_children:
-                            existing_child = matching_children[0]
-                else:
-                    # No predicate, just find by tag
-                    existing_child = current.find(tag_name)
+                existing_child = _find_child(current, steps[i], child_index)
 
                 if existing_child is not None:
                     # Child exists, use it
                     current = existing_child
                     # If this is the final element and we're setting a value, update it
-                    if i == len(parts) - 1:
+                    if is_target:
                         if attributes:
-                            for attr_name, attr_value in attributes.items():
-                                existing_child.set(attr_name, attr_value)
+                            changed = _set_attributes(existing_child, attributes, child_index) or changed
                         if value is not None:
-                            existing_child.text = value
+                            changed = _set_text(existing_child, value, child_index) or changed
                     continue
 
-                # Create new element
-                new_element = etree.SubElement(current, tag_name)
-
-                # Set predicate attributes/children if this is an intermediate node with predicates
-                if predicate:
-                    if predicate_type == 'attr':
-                        # Set attributes
-                        for attr_name, attr_value in predicate.items():
-                            new_element.set(attr_name, attr_value)
-                    elif predicate_type == 'child' and i < len(parts) - 1:
-                        # Create child elements only for intermediate nodes
-                        # Not for the final target node (that gets handled separately)
-                        for child_name, child_value in predicate.items():
-                            child_elem = etree.SubElement(new_element, child_name)
-                            child_elem.text = child_value
+                # Create new element, with predicate attributes/children
+                new_element = _create_child(current, steps[i], not is_target, child_index)
+                changed = True
 
                 # If this is the last element, set value or attributes
-                if i == len(parts) - 1:
+                if is_target:
                     if attributes:
-                        for attr_name, attr_value in attributes.items():
-                            new_element.set(attr_name, attr_value)
+                        _set_attributes(new_element, attributes, child_index)
                     if value is not None:
-                        new_element.text = value
+                        _set_text(new_element, value, child_index)
 
                 current = new_element
     else:
         # Parent nodes exist, set/update the target element in each
         for parent in parent_nodes:
-            tag_name, predicate_type, predicate = parse_predicate(target_part)
-
-            # Check if target already exists in this parent
-            if predicate:
-                if predicate_type == 'attr':
-                    # Attribute predicate - find matching child
-                    matching_children = [
-                        child for child in parent.findall(tag_name)
-                        if all(child.get(k) == v for k, v in predicate.items())
-                    ]
-                    if matching_children:
-                        target_node = matching_children[0]
-                    else:
-                        # Create new element with predicate
-                        target_node = etree.SubElement(parent, tag_name)
-                        for attr_name, attr_value in predicate.items():
-                            target_node.set(attr_name, attr_value)
-                else:
-                    # Child element predicate - find or create
-                    matching_children = [
-                        child for child in parent.findall(tag_name)
-                        if all(
-                            child.find(k) is not None and child.find(k).text == v
-                            for k, v in predicate.items()
-                        )
-                    ]
-                    if matching_children:
-                        target_node = matching_children[0]
-                    else:
-                        # Create new element - but don't add predicate children yet
-                        # because the predicate IS the target we're trying to set
-                        target_node = etree.SubElement(parent, tag_name)
-            else:
-                # No predicate, find or create simple element
-                target_node = parent.find(tag_name)
-                if target_node is None:
-                    target_node = etree.SubElement(parent, tag_name)
+            # Find the target in this parent or create it
+            target_node = _find_child(parent, target_step, child_index)
+            if target_node is None:
+                target_node = _create_child(parent, target_step, False, child_index)
+                changed = True
 
             # Set the value or attributes on the target node
             if attributes:
-                for attr_name, attr_value in attributes.items():
-                    target_node.set(attr_name, attr_value)
+                changed = _set_attributes(target_node, attributes, child_index) or changed
             if value is not None:
-                target_node.text = value
+                changed = _set_text(target_node, value, child_index) or changed
 
-    # Return XML as UTF-8 string (without root node and xml declaration)
-    result_parts = [etree.tostring(child, encoding='utf-8', pretty_print=True).decode('utf-8').rstrip() for child in root]
-
-    # subst. & symbol
-    return convert_xml_content_back('\n'.join(result_parts))
+    return changed
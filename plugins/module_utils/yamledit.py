@@ -7,33 +7,78 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
+import copy
 import yaml
+from collections import namedtuple
+from functools import lru_cache
+from itertools import repeat
 
-def yamledit(yaml_content, key, separator='.', value=None, state='present', append_unique=False):
+# libyaml based loader and dumper are much faster, PyYAML may be built without them
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+# Maximum number of compiled keys kept in the cache
+KEY_CACHE_SIZE = 1024
+
+# Maximum number of nulls added before a list item set past the end of the list
+DEFAULT_MAX_LIST_GAP = 100
+
+# A step of a compiled key: its text, the list index it stands for (None for a dict key)
+# and whether it is a '*' wildcard, matching every item of a dict or list
+KeyStep = namedtuple('KeyStep', ['part', 'index', 'wildcard'])
+
+
+def yamledit(yaml_content, key=None, separator='.', value=None, state='present', append_unique=False, operations=None,
+             round_trip=False, values=None, max_list_gap=DEFAULT_MAX_LIST_GAP, document=None):
     """
     Edit YAML content by setting or removing values at a specific key path.
 
     Args:
         yaml_content (str): YAML content as a string
-        key (str): Path to the element in YAML, separated by separator
+        key (str): Path to the element in YAML, separated by separator. A '*' part matches every
+            item of a dict or list, a backslash escapes the separator, '*' or a backslash in a part
         separator (str): Separator for the key path (default: '.')
         value: Value to set (can be scalar, list, or dict). Ignored if state='absent'
         state (str): 'present' to set value, 'absent' to remove element
         append_unique (bool): If True, append value to list only if it doesn't exist
+        operations (list): Dicts with key, separator, value, values, state and append_unique,
+            applied in order to the same document instead of the single key operation.
+            separator defaults to the separator argument
+        round_trip (bool): If True, only the text of the changed entries is rewritten and the rest
+            of the content (comments, quoting, formatting) is kept as is. Falls back to dumping
+            the whole document when a change can't be spliced into the text
+        values (list): Values to append with append_unique instead of value, each one only if
+            it is not in the list yet
+        max_list_gap (int): Maximum number of nulls added to a list to set an index past its end,
+            None for no limit
+        document (int or dict): Treat yaml_content as a stream of '---' separated documents and
+            edit only the ones selected: the document at this index (negative counts from the end),
+            or every document where each key (a path like key) has the given value. The other
+            documents are kept as they are
 
     Returns:
-        str: Modified YAML content
+        str: Modified YAML content, yaml_content itself if no operation changes anything
 
     Raises:
-        ValueError: If key is invalid or empty, or if append_unique is used with non-list
+        ValueError: If key is invalid or empty, if append_unique is used with non-list,
+            or if values is used without append_unique, or if an index is too far past the end of a list,
+            or if no document matches document
     """
 
-    if not key:
-        raise ValueError("key parameter cannot be empty")
+    operations = _collect_operations(key, separator, value, state, append_unique, operations, values)
+
+    if document is not None:
+        return _edit_stream(yaml_content, operations, document, separator, round_trip, max_list_gap)
+    return _edit_document(yaml_content, operations, round_trip, max_list_gap)
+
 
+def _edit_document(yaml_content, operations, round_trip=False, max_list_gap=DEFAULT_MAX_LIST_GAP):
+    """Apply operations to a single YAML document, see yamledit."""
     # Parse YAML content
     try:
-        data = yaml.safe_load(yaml_content)
+        data = yaml.load(yaml_content, Loader=SafeLoader)
     except yaml.YAMLError as e:
         raise ValueError(f"Invalid YAML content: {str(e)}")
 
@@ -41,212 +86,722 @@ def yamledit(yaml_content, key, separator='.', value=None, state='present', appe
     if data is None:
         data = {}
 
-    # Split key by separator
-    key_parts = key.split(separator)
+    # Apply every operation to the same document, it is dumped once
+    changed = False
+    for operation in operations:
+        changed |= _apply_operation(data, *operation, max_list_gap=max_list_gap)
+
+    # Nothing to dump when the document is left as it was
+    if not changed:
+        return yaml_content
+
+    if round_trip:
+        try:
+            spliced = _round_trip_edit(yaml_content, operations, max_list_gap)
+        except Exception:
+            # Anything the splicing doesn't handle ends up dumping the whole document
+            spliced = None
+        # Only trust the spliced text if it loads to the same data
+        if spliced is not None and _same_value(yaml.load(spliced, Loader=SafeLoader), data):
+            return spliced
+
+    # Convert back to YAML
+    return _dump(data)
+
+
+def _edit_stream(yaml_content, operations, document, separator='.', round_trip=False,
+                 max_list_gap=DEFAULT_MAX_LIST_GAP):
+    """
+    Apply operations to the documents of a YAML stream selected by document, see yamledit.
+
+    Only the selected documents are loaded (all of them for a key match selector) and dumped,
+    the text of the others is copied as is.
+    """
+    chunks = _split_documents(yaml_content)
+    selected = _select_documents(chunks, document, separator)
+    if not selected:
+        raise ValueError(f"No document in the YAML stream matches {document!r}")
+
+    changed = False
+    for i in selected:
+        head, body = _split_document_head(chunks[i])
+        edited = _edit_document(body, operations, round_trip, max_list_gap)
+        if edited is not body:
+            if head and not head.endswith('\n'):
+                head += '\n'
+            chunks[i] = head + edited
+            changed = True
+    return ''.join(chunks) if changed else yaml_content
+
+
+def _split_documents(yaml_content):
+    """
+    Split a YAML stream into the text of each of its documents.
+
+    A document runs from its '---' line (the start of the stream for the first one) to the
+    next '---', comments in between belong to the document before them.
+    """
+    try:
+        starts = [event.start_mark.index for event in yaml.parse(yaml_content, Loader=SafeLoader)
+                  if isinstance(event, yaml.DocumentStartEvent)]
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML content: {str(e)}")
+    bounds = [0] + starts[1:] + [len(yaml_content)]
+    return [yaml_content[start:end] for start, end in zip(bounds, bounds[1:])]
+
 
+def _split_document_head(chunk):
+    """Split the text of a document into its '---' line (with the comments before it) and the rest."""
+    loader = SafeLoader(chunk)
+    try:
+        while loader.check_event():
+            event = loader.get_event()
+            if isinstance(event, yaml.DocumentStartEvent):
+                break
+        else:
+            return '', chunk
+    finally:
+        loader.dispose()
+    if not event.explicit:
+        return '', chunk
+    end = event.end_mark.index
+    line_end = chunk.find('\n', end)
+    # Keep comments after '---' in the head, content on the same line goes to the body
+    rest = chunk[end:line_end if line_end != -1 else len(chunk)]
+    if not rest.strip() or rest.lstrip().startswith('#'):
+        end = line_end + 1 if line_end != -1 else len(chunk)
+    return chunk[:end], chunk[end:]
+
+
+def _select_documents(chunks, document, separator='.'):
+    """Return the indexes of the documents selected by document, see yamledit."""
+    if isinstance(document, str) and document.lstrip('-').isdigit():
+        document = int(document)
+    if isinstance(document, int) and not isinstance(document, bool):
+        if -len(chunks) <= document < len(chunks):
+            return [document % len(chunks)]
+        return []
+    if not isinstance(document, dict) or not document:
+        raise ValueError(f"document must be an index or a dict of keys and values, got {document!r}")
+
+    matchers = [(compile_key(key, separator), value) for key, value in document.items()]
+    selected = []
+    for i, chunk in enumerate(chunks):
+        try:
+            data = yaml.load(chunk, Loader=SafeLoader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid YAML content: {str(e)}")
+        if all(value in _get_values(data, steps) for steps, value in matchers):
+            selected.append(i)
+    return selected
+
+
+def _get_values(data, steps):
+    """Return the values found at steps in data, a path that doesn't exist has none."""
+    parents, _ = _walk(data, steps, create=False)
+    final_step = steps[-1]
+    found = []
+    for current in parents:
+        if final_step.wildcard:
+            if isinstance(current, dict):
+                found.extend(current.values())
+            elif isinstance(current, list):
+                found.extend(current)
+        elif final_step.index is not None:
+            if isinstance(current, list) and -len(current) <= final_step.index < len(current):
+                found.append(current[final_step.index])
+        elif isinstance(current, dict) and final_step.part in current:
+            found.append(current[final_step.part])
+    return found
+
+
+def _dump(data):
+    return yaml.dump(data, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, sort_keys=False)
+
+
+def _collect_operations(key=None, separator='.', value=None, state='present', append_unique=False, operations=None,
+                        values=None):
+    """
+    Build the list of (steps, value, state, append_unique) operations to apply.
+    For append_unique operations value is the list of values to append.
+
+    Raises:
+        ValueError: If a key is empty or values is given without append_unique
+    """
+    if operations is None:
+        operations = [dict(key=key, separator=separator, value=value, values=values, state=state,
+                           append_unique=append_unique)]
+
+    collected = []
+    for operation in operations:
+        op_key = operation.get('key')
+        if not op_key:
+            raise ValueError("key parameter cannot be empty")
+        op_separator = operation.get('separator') or separator
+        op_append_unique = bool(operation.get('append_unique'))
+        op_value = operation.get('value')
+        if operation.get('values') is not None:
+            if not op_append_unique:
+                raise ValueError("values parameter can only be used with append_unique")
+            op_value = list(operation['values'])
+        elif op_append_unique:
+            op_value = [op_value]
+        collected.append((
+            compile_key(op_key, op_separator),
+            op_value,
+            operation.get('state') or 'present',
+            op_append_unique,
+        ))
+    return collected
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def compile_key(key, separator='.'):
+    """
+    Split key by separator into a tuple of KeyStep, once per key and separator.
+
+    'a\\.b' is the single part 'a.b', '\\*' a literal '*' part and '\\\\' a backslash,
+    other backslashes are kept as they are.
+    """
+    steps = []
+    part = []
+    literal = False
+    i = 0
+    while i < len(key):
+        if key.startswith(separator, i):
+            steps.append(_key_step(''.join(part), literal))
+            part = []
+            literal = False
+            i += len(separator)
+            continue
+        if key[i] == '\\':
+            if key.startswith(separator, i + 1):
+                part.append(separator)
+                literal = True
+                i += 1 + len(separator)
+                continue
+            if key[i + 1:i + 2] in ('\\', '*'):
+                part.append(key[i + 1])
+                literal = True
+                i += 2
+                continue
+        part.append(key[i])
+        i += 1
+    steps.append(_key_step(''.join(part), literal))
+    return tuple(steps)
+
+
+def _key_step(part, literal):
+    if part == '*' and not literal:
+        return KeyStep(part, None, True)
+    return KeyStep(part, int(part) if _is_list_index(part) else None, False)
+
+
+def _path_text(steps):
+    return '.'.join(step.part for step in steps)
+
+
+def _apply_operation(data, steps, value, state, append_unique, max_list_gap=DEFAULT_MAX_LIST_GAP):
+    """
+    Apply one operation to the parsed document.
+
+    Args:
+        data: The root data structure (dict or list)
+        steps: Compiled key, see compile_key
+        value: Value to set, or list of values to append with append_unique. Ignored if state='absent'
+        state (str): 'present' to set value, 'absent' to remove element
+        append_unique (bool): If True, append the values to list, each only if it doesn't exist
+        max_list_gap (int): Maximum number of nulls added to a list, None for no limit
+
+    Returns:
+        bool: True if the document was changed
+    """
     # Navigate to the target location
     if state == 'absent':
         # For absent state, we need to remove the key
-        _remove_value(data, key_parts)
+        return _remove_value(data, steps)
     elif append_unique:
-        # For append_unique mode, append value to list if unique
-        _append_unique_value(data, key_parts, value)
+        # For append_unique mode, append values to list if unique
+        return _append_unique_values(data, steps, value, max_list_gap)
     else:
         # For present state, set the value
-        _set_value(data, key_parts, value)
+        return _set_value(data, steps, value, max_list_gap)
 
-    # Convert back to YAML
-    return yaml.dump(data, default_flow_style=False, allow_unicode=True, sort_keys=False)
 
+# Round trip editing: every operation is located in the node tree composed from the current
+# text, the entry it changes is found (the deepest block mapping entry on its path) and only
+# that entry's text is replaced, removed or inserted, with the dumper's rendering of its new value.
 
-def _set_value(data, key_parts, value):
-    """
-    Set a value in nested dict/list structure.
+_MISSING = object()
 
-    Args:
-        data: The root data structure (dict or list)
-        key_parts: List of key parts representing the path
-        value: Value to set
-    """
-    current = data
-
-    # Navigate to the parent of the target
-    for i, part in enumerate(key_parts[:-1]):
-        # Check if part is a list index
-        if _is_list_index(part):
-            index = int(part)
-            # Ensure current is a list
-            if not isinstance(current, list):
-                raise ValueError(f"Expected list at '{'.'.join(key_parts[:i])}', but found {type(current).__name__}")
 
-            # Extend list if needed
-            while len(current) <= index:
-                current.append(None)
-
-            # Get or create the next level
-            if current[index] is None:
-                # Determine what to create based on next part
-                next_part = key_parts[i + 1]
-                if _is_list_index(next_part):
-                    current[index] = []
-                else:
-                    current[index] = {}
-
-            current = current[index]
-        else:
-            # Dictionary key
-            if not isinstance(current, dict):
-                raise ValueError(f"Expected dict at '{'.'.join(key_parts[:i])}', but found {type(current).__name__}")
+def _round_trip_edit(yaml_content, operations, max_list_gap=DEFAULT_MAX_LIST_GAP):
+    """
+    Apply operations to the text of yaml_content, keeping everything they don't change.
 
-            # Create next level if it doesn't exist
-            if part not in current:
-                # Determine what to create based on next part
-                next_part = key_parts[i + 1]
-                if _is_list_index(next_part):
-                    current[part] = []
-                else:
-                    current[part] = {}
+    Returns:
+        str: Edited content, None if it can't be edited this way
+    """
+    text = yaml_content
+    for steps, value, state, append_unique in operations:
+        text = _splice_operation(text, steps, copy.deepcopy(value), state, append_unique, max_list_gap)
+        if text is None:
+            return None
+    return text
 
-            current = current[part]
 
-    # Set the final value
-    final_key = key_parts[-1]
+def _splice_operation(text, steps, value, state, append_unique, max_list_gap):
+    # A wildcard may change entries all over the document
+    if any(step.wildcard for step in steps):
+        return None
+    key_parts = [step.part for step in steps]
 
-    if _is_list_index(final_key):
-        index = int(final_key)
-        if not isinstance(current, list):
-            raise ValueError(f"Expected list at '{'.'.join(key_parts[:-1])}', but found {type(current).__name__}")
+    loader = SafeLoader(text)
+    try:
+        root = loader.get_single_node()
+        data = loader.construct_document(root) if root is not None else None
+    finally:
+        loader.dispose()
+    if not _is_block_mapping(root):
+        return None
+
+    # Walk the block mappings along the key path, remembering the (mapping, entry) pairs
+    chain = []
+    mapping = root
+    for part in key_parts:
+        entry = _find_entry(mapping, part)
+        chain.append((mapping, entry))
+        if entry is None or not _is_block_mapping(entry[1]):
+            break
+        mapping = entry[1]
+
+    old_data = copy.deepcopy(_lookup(data, key_parts[:1]))
+    _apply_operation(data, steps, value, state, append_unique, max_list_gap)
+
+    # Removing the only entry of a mapping would leave null instead of {}, rewrite the parent instead
+    depth = len(chain)
+    while depth > 1 and chain[depth - 1][1] is not None and len(chain[depth - 1][0].value) == 1 \
+            and _lookup(data, key_parts[:depth]) is _MISSING:
+        depth -= 1
+
+    mapping, entry = chain[depth - 1]
+    entry_key = key_parts[depth - 1]
+    new_value = _lookup(data, key_parts[:depth])
+    if entry is None:
+        if new_value is _MISSING:
+            return text
+        return _insert_entry(text, mapping, entry_key, new_value)
+    if new_value is _MISSING:
+        return _remove_entry(text, entry)
+    old_value = _lookup(old_data, key_parts[1:depth])
+    if _same_value(new_value, old_value):
+        return text
+    if _is_block_sequence(entry[1]) and isinstance(old_value, list) and isinstance(new_value, list) \
+            and len(new_value) > len(old_value) and _same_value(new_value[:len(old_value)], old_value):
+        # Items appended to a list are added after its last item
+        return _append_items(text, entry[1], new_value[len(old_value):])
+    return _replace_entry(text, entry, entry_key, new_value)
+
+
+def _is_block_mapping(node):
+    return isinstance(node, yaml.MappingNode) and not node.flow_style
+
+
+def _is_block_sequence(node):
+    return isinstance(node, yaml.SequenceNode) and not node.flow_style and bool(node.value)
+
+
+def _find_entry(mapping, part):
+    """Return the last (key_node, value_node) of mapping with the string key part, or None."""
+    found = None
+    for key_node, value_node in mapping.value:
+        if isinstance(key_node, yaml.ScalarNode) and key_node.tag == 'tag:yaml.org,2002:str' and key_node.value == part:
+            found = (key_node, value_node)
+    return found
+
+
+def _lookup(data, key_parts):
+    for part in key_parts:
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def _line_start(text, index):
+    return text.rfind('\n', 0, index) + 1
+
+
+def _node_end(text, node):
+    """Return the index right after the last character of a node."""
+    # The end mark of a block collection is where the next token starts, so use its last descendant
+    while isinstance(node, (yaml.MappingNode, yaml.SequenceNode)) and not node.flow_style and node.value:
+        node = node.value[-1][1] if isinstance(node, yaml.MappingNode) else node.value[-1]
+    end = node.end_mark.index
+    while end > 0 and text[end - 1] in ' \t\r\n':
+        end -= 1
+    return end
+
+
+def _entry_end(text, entry):
+    """Return the index right after the last character of an entry's value (or its ':')."""
+    key_node, value_node = entry
+    return max(_node_end(text, value_node), text.index(':', key_node.end_mark.index) + 1)
+
+
+def _line_after(text, index):
+    """Return (text, index of the start of the line after index), adding a final newline if needed."""
+    position = text.find('\n', index)
+    if position == -1:
+        text += '\n'
+        return text, len(text)
+    return text, position + 1
+
+
+def _indent_lines(rendered, column, first_line=True):
+    lines = rendered.rstrip('\n').split('\n')
+    indent = ' ' * column
+    indented = [indent + line if line else line for line in lines]
+    if not first_line:
+        indented[0] = lines[0]
+    return '\n'.join(indented)
+
+
+def _replace_entry(text, entry, key, value):
+    start = entry[0].start_mark.index
+    column = start - _line_start(text, start)
+    rendered = _indent_lines(_dump({key: value}), column, first_line=False)
+    return text[:start] + rendered + text[_entry_end(text, entry):]
+
+
+def _remove_entry(text, entry):
+    key_start = entry[0].start_mark.index
+    start = _line_start(text, key_start)
+    if text[start:key_start].strip():
+        # First key of a sequence item, its line also holds the '- '
+        return None
+    end = text.find('\n', _entry_end(text, entry))
+    end = len(text) if end == -1 else end + 1
+    return text[:start] + text[end:]
 
-        # Extend list if needed
-        while len(current) <= index:
-            current.append(None)
 
-        current[index] = value
-    else:
-        if not isinstance(current, dict):
-            raise ValueError(f"Expected dict at '{'.'.join(key_parts[:-1])}', but found {type(current).__name__}")
+def _insert_entry(text, mapping, key, value):
+    first_key_start = mapping.value[0][0].start_mark.index
+    column = first_key_start - _line_start(text, first_key_start)
+    text, position = _line_after(text, _entry_end(text, mapping.value[-1]))
+    return text[:position] + _indent_lines(_dump({key: value}), column) + '\n' + text[position:]
+
 
-        current[final_key] = value
+def _append_items(text, sequence, items):
+    first_item_start = sequence.value[0].start_mark.index
+    dash = text.rfind('-', _line_start(text, first_item_start), first_item_start)
+    column = dash - _line_start(text, dash)
+    text, position = _line_after(text, _node_end(text, sequence.value[-1]))
+    return text[:position] + _indent_lines(_dump(items), column) + '\n' + text[position:]
 
 
-def _remove_value(data, key_parts):
+def _walk(data, steps, create, max_list_gap=DEFAULT_MAX_LIST_GAP):
     """
-    Remove a value from nested dict/list structure.
+    Find the containers holding the last step of steps, going through the document level by level.
 
     Args:
         data: The root data structure (dict or list)
-        key_parts: List of key parts representing the path
+        steps: Compiled key, see compile_key
+        create (bool): If True, missing dict keys and list items on the way are created and a
+            container of the wrong type raises ValueError. Otherwise such paths are skipped
+        max_list_gap (int): Maximum number of nulls added to a list, None for no limit
+
+    Returns:
+        tuple: (list of containers, bool: True if anything was created)
     """
-    if not key_parts:
-        return
-
-    current = data
-    path = []
-
-    # Navigate to the parent of the target
-    for i, part in enumerate(key_parts[:-1]):
-        path.append((current, part))
-
-        if _is_list_index(part):
-            index = int(part)
-            if not isinstance(current, list) or len(current) <= index:
-                # Path doesn't exist, nothing to remove
-                return
-            current = current[index]
-        else:
-            if not isinstance(current, dict) or part not in current:
-                # Path doesn't exist, nothing to remove
-                return
-            current = current[part]
-
-    # Remove the final key
-    final_key = key_parts[-1]
-
-    if _is_list_index(final_key):
-        index = int(final_key)
-        if isinstance(current, list) and len(current) > index:
-            current.pop(index)
-    else:
-        if isinstance(current, dict) and final_key in current:
-            del current[final_key]
+    nodes = [data]
+    changed = False
+    for i, step in enumerate(steps[:-1]):
+        next_step = steps[i + 1]
+        children = []
+        for node in nodes:
+            if step.wildcard:
+                if isinstance(node, dict):
+                    node = node.values()
+                elif not isinstance(node, list):
+                    continue
+                # Only existing items the rest of the path can go through are matched
+                children.extend(child for child in node if _fits(child, next_step))
+                continue
+
+            if step.index is not None:
+                if not isinstance(node, list):
+                    if create:
+                        raise ValueError(f"Expected list at '{_path_text(steps[:i])}', but found {type(node).__name__}")
+                    continue
+                # Extend list if needed
+                if len(node) <= step.index:
+                    if not create:
+                        continue
+                    _grow_list(node, step.index, steps[:i], max_list_gap)
+                    changed = True
+                child = node[step.index]
+                key = step.index
+            else:
+                if not isinstance(node, dict):
+                    if create:
+                        raise ValueError(f"Expected dict at '{_path_text(steps[:i])}', but found {type(node).__name__}")
+                    continue
+                if step.part in node:
+                    children.append(node[step.part])
+                    continue
+                if not create:
+                    continue
+                child = None
+                key = step.part
+
+            # Create the next level, what to create is given by the next step
+            if child is None and create:
+                if next_step.wildcard:
+                    continue
+                child = node[key] = [] if next_step.index is not None else {}
+                changed = True
+            children.append(child)
+        nodes = children
+    return nodes, changed
+
+
+def _grow_list(node, index, steps, max_list_gap):
+    """
+    Extend the list node with nulls up to index, in one go.
+
+    Raises:
+        ValueError: If more than max_list_gap nulls would be added, which usually means a mistyped
+            index that would otherwise fill the file with nulls
+    """
+    gap = index - len(node)
+    if max_list_gap is not None and gap > max_list_gap:
+        raise ValueError(f"Index {index} is {gap} items past the end of the list of {len(node)} items "
+                         f"at '{_path_text(steps)}' (max_list_gap is {max_list_gap})")
+    node.extend(repeat(None, gap + 1))
+
+
+def _fits(node, step):
+    """Check if step can be applied to node."""
+    if step.wildcard:
+        return isinstance(node, (dict, list))
+    return isinstance(node, list if step.index is not None else dict)
+
+
+def _items(node, steps):
+    """Return the keys of every item of a dict or list, for a wildcard last step."""
+    if isinstance(node, dict):
+        return list(node)
+    if isinstance(node, list):
+        return range(len(node))
+    raise ValueError(f"Expected dict or list at '{_path_text(steps[:-1])}', but found {type(node).__name__}")
+
 
+def _value_copies(value):
+    """Yield value, then deep copies of it: nodes sharing an object would be dumped as an alias."""
+    yield value
+    while True:
+        yield copy.deepcopy(value)
 
-def _append_unique_value(data, key_parts, value):
+
+def _set_value(data, steps, value, max_list_gap=DEFAULT_MAX_LIST_GAP):
     """
-    Append a value to a list only if it doesn't already exist.
-    Creates an empty list if the key doesn't exist.
+    Set a value in nested dict/list structure.
 
     Args:
         data: The root data structure (dict or list)
-        key_parts: List of key parts representing the path
-        value: Value to append to the list
+        steps: Compiled key, see compile_key
+        value: Value to set
+        max_list_gap (int): Maximum number of nulls added to a list, None for no limit
+
+    Returns:
+        bool: True if anything was created or changed
 
     Raises:
-        ValueError: If the key exists but is not a list
+        ValueError: If the path goes through a node of the wrong type or too far past the end of a list
     """
-    current = data
-
-    # Navigate to the parent of the target
-    for i, part in enumerate(key_parts[:-1]):
-        # Check if part is a list index
-        if _is_list_index(part):
-            index = int(part)
-            # Ensure current is a list
+    parents, changed = _walk(data, steps, create=True, max_list_gap=max_list_gap)
+    final_step = steps[-1]
+    copies = _value_copies(value)
+
+    for current in parents:
+        if final_step.wildcard:
+            keys = _items(current, steps)
+        elif final_step.index is not None:
             if not isinstance(current, list):
-                raise ValueError(f"Expected list at '{'.'.join(key_parts[:i])}', but found {type(current).__name__}")
+                raise ValueError(f"Expected list at '{_path_text(steps[:-1])}', but found {type(current).__name__}")
 
             # Extend list if needed
-            while len(current) <= index:
-                current.append(None)
-
-            # Get or create the next level
-            if current[index] is None:
-                # Determine what to create based on next part
-                next_part = key_parts[i + 1]
-                if _is_list_index(next_part):
-                    current[index] = []
-                else:
-                    current[index] = {}
-
-            current = current[index]
+            if len(current) <= final_step.index:
+                _grow_list(current, final_step.index, steps[:-1], max_list_gap)
+                current[final_step.index] = next(copies)
+                changed = True
+                continue
+            keys = (final_step.index,)
         else:
-            # Dictionary key
             if not isinstance(current, dict):
-                raise ValueError(f"Expected dict at '{'.'.join(key_parts[:i])}', but found {type(current).__name__}")
+                raise ValueError(f"Expected dict at '{_path_text(steps[:-1])}', but found {type(current).__name__}")
+            if final_step.part not in current:
+                current[final_step.part] = next(copies)
+                changed = True
+                continue
+            keys = (final_step.part,)
 
-            # Create next level if it doesn't exist
-            if part not in current:
-                # Determine what to create based on next part
-                next_part = key_parts[i + 1]
-                if _is_list_index(next_part):
-                    current[part] = []
-                else:
-                    current[part] = {}
+        for key in keys:
+            if not _same_value(current[key], value):
+                current[key] = next(copies)
+                changed = True
+    return changed
 
-            current = current[part]
 
-    # Handle the final key
-    final_key = key_parts[-1]
+def _remove_value(data, steps):
+    """
+    Remove a value from nested dict/list structure.
 
-    if _is_list_index(final_key):
+    Args:
+        data: The root data structure (dict or list)
+        steps: Compiled key, see compile_key
+
+    Returns:
+        bool: True if anything was removed
+    """
+    if not steps:
+        return False
+
+    # Paths that don't exist have nothing to remove
+    parents, _ = _walk(data, steps, create=False)
+    final_step = steps[-1]
+    changed = False
+
+    for current in parents:
+        if final_step.wildcard:
+            if isinstance(current, (dict, list)) and current:
+                current.clear()
+                changed = True
+        elif final_step.index is not None:
+            if isinstance(current, list) and len(current) > final_step.index:
+                current.pop(final_step.index)
+                changed = True
+        elif isinstance(current, dict) and final_step.part in current:
+            del current[final_step.part]
+            changed = True
+    return changed
+
+
+def _append_unique_values(data, steps, values, max_list_gap=DEFAULT_MAX_LIST_GAP):
+    """
+    Append values to a list, each only if it doesn't already exist.
+    Creates an empty list if the key doesn't exist.
+
+    Membership is checked against a set of hashable canonical forms of the list items,
+    so appending m values to a list of n items takes O(n + m).
+
+    Args:
+        data: The root data structure (dict or list)
+        steps: Compiled key, see compile_key. A wildcard last step appends to every list it matches
+        values: List of values to append to the list
+        max_list_gap (int): Maximum number of nulls added to a list on the way, None for no limit
+
+    Returns:
+        bool: True if anything was created or appended
+
+    Raises:
+        ValueError: If the key exists but is not a list
+    """
+    parents, changed = _walk(data, steps, create=True, max_list_gap=max_list_gap)
+
+    final_step = steps[-1]
+    if final_step.index is not None:
         # Can't use append_unique with list index
-        raise ValueError(f"append_unique cannot be used with list index '{final_key}'")
-    else:
+        raise ValueError(f"append_unique cannot be used with list index '{final_step.part}'")
+
+    targets = []
+    for current in parents:
+        if final_step.wildcard:
+            targets.extend(current[key] for key in _items(current, steps) if isinstance(current[key], list))
+            continue
+
         if not isinstance(current, dict):
-            raise ValueError(f"Expected dict at '{'.'.join(key_parts[:-1])}', but found {type(current).__name__}")
+            raise ValueError(f"Expected dict at '{_path_text(steps[:-1])}', but found {type(current).__name__}")
 
         # Check if key exists
-        if final_key not in current:
+        if final_step.part not in current:
             # Key doesn't exist, create empty list
-            current[final_key] = []
+            current[final_step.part] = []
+            changed = True
 
         # Ensure the value is a list
-        if not isinstance(current[final_key], list):
-            raise ValueError(f"Key '{'.'.join(key_parts)}' exists but is not a list (found {type(current[final_key]).__name__})")
+        if not isinstance(current[final_step.part], list):
+            raise ValueError(f"Key '{_path_text(steps)}' exists but is not a list (found {type(current[final_step.part]).__name__})")
+        targets.append(current[final_step.part])
+
+    copies = _value_copies(values)
+    for target in targets:
+        changed |= _append_unique(target, next(copies))
+    return changed
+
+
+def _append_unique(target, values):
+    """Append to the list target the values that are not already in it."""
+    changed = False
+    seen = None
+    for value in values:
+        try:
+            canonical = _canonical(value)
+        except TypeError:
+            # No hashable form, compare with every item
+            if any(_same_value(item, value) for item in target):
+                continue
+        else:
+            if seen is None:
+                seen = _canonical_set(target)
+            if canonical in seen:
+                continue
+            seen.add(canonical)
+        target.append(value)
+        changed = True
+    return changed
+
 
-        # Append value if it's not already in the list
-        if value not in current[final_key]:
-            current[final_key].append(value)
+def _canonical(value):
+    """
+    Return a hashable form of value, equal for values that _same_value considers the same.
+
+    Raises:
+        TypeError: If value contains something that has no hashable form
+    """
+    if isinstance(value, dict):
+        return dict, frozenset((_canonical(k), _canonical(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return list, tuple(_canonical(item) for item in value)
+    if isinstance(value, set):
+        return set, frozenset(_canonical(item) for item in value)
+    hash(value)
+    return type(value), value
+
+
+def _canonical_set(items):
+    """Return the set of canonical forms of items, skipping the ones without it."""
+    seen = set()
+    for item in items:
+        try:
+            seen.add(_canonical(item))
+        except TypeError:
+            pass
+    return seen
+
+
+def _same_value(a, b):
+    """
+    Compare two values the way they would be dumped, so that e.g. 1 and True differ.
+    """
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return len(a) == len(b) and all(k in b and _same_value(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same_value(x, y) for x, y in zip(a, b))
+    return a == b
 
 
 def _is_list_index(key_part):
@@ -23,7 +23,8 @@ options:
     path:
         description:
             - Path to the XML file to edit
-        required: true
+            - Required unless I(files) is used
+        required: false
         type: path
     xpath:
         description:
@@ -63,6 +64,68 @@ options:
         required: false
         type: bool
         default: false
+    fsync:
+        description:
+            - Flush the new content to disk before it replaces the file
+            - The file is always replaced atomically (written to a temporary file in the same directory and renamed), fsync also makes the change survive a crash
+            - With C(files), directories are flushed once after all files are written
+        required: false
+        type: bool
+        default: false
+    diff_format:
+        description:
+            - How the diff of a changed file is returned
+            - C(full) returns the whole content before and after the change
+            - C(unified) returns only a unified diff, computed on the managed host, which is much smaller for big files
+        required: false
+        type: str
+        choices: ['full', 'unified']
+        default: full
+    diff_max_size:
+        description:
+            - Maximum size of a unified diff in characters, a longer one is truncated
+        required: false
+        type: int
+        default: 65536
+    cache_dir:
+        description:
+            - Directory where the operations found to change nothing in a file are recorded, with the state of the file (inode, mtime, size and sha256)
+            - A rerun of the same operations on the unchanged file returns changed=false after a stat and a hash of the file, without parsing it
+        required: false
+        type: path
+    streaming:
+        description:
+            - Process the file incrementally instead of loading it whole, for very large files like merged rule files
+            - Only top level nodes reachable by the operations are kept in memory, other ones are copied through
+            - Every xpath and when_xpath_exist must be absolute and use child element steps only
+            - The diff is not returned in this mode
+        required: false
+        type: bool
+        default: false
+    files:
+        description:
+            - List of files to edit in one module run, instead of I(path)
+            - Each entry is a dict with its own path and task_block
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            path:
+                description:
+                    - Path to the XML file to edit
+                required: true
+                type: path
+            task_block:
+                description:
+                    - List of operations to apply to this file, same format as I(task_block)
+                required: true
+                type: list
+                elements: dict
+            backup:
+                description:
+                    - Create a backup file before modifying, defaults to I(backup)
+                required: false
+                type: bool
 author:
     - Your Name (@yourhandle)
 '''
@@ -111,6 +174,28 @@ EXAMPLES = r'''
     value: "1514"
     when_xpath_exist: /ossec_config/client/server
     backup: true
+
+# Edit a big rules file without loading it into memory
+- name: Tune a rule in merged rules
+  pyurin.utils.ossconf_edit:
+    path: /var/ossec/etc/rules/merged_rules.xml
+    xpath: /group[@name='syslog,sshd,']/rule[@id='5710']
+    attributes:
+      level: "8"
+    streaming: true
+
+# Edit several files in one module run
+- name: Configure agent files
+  pyurin.utils.ossconf_edit:
+    files:
+      - path: /var/ossec/etc/ossec.conf
+        task_block:
+          - xpath: /ossec_config/client/server/address
+            value: "192.168.1.100"
+      - path: /var/ossec/etc/shared/agent.conf
+        task_block:
+          - xpath: /agent_config/labels/label[@key='env']
+            value: "prod"
 '''
 
 RETURN = r'''
@@ -125,113 +210,282 @@ msg:
     returned: always
     sample: "XML file modified successfully"
 diff:
-    description: Differences between original and modified content
+    description:
+        - Differences between original and modified content
+        - A list with one entry per changed file when I(files) is used
     type: dict
-    returned: when changed
+    returned: when changed and not streaming
     contains:
         before:
-            description: Content before modification
+            description: Content before modification, when diff_format=full
             type: str
         after:
-            description: Content after modification
+            description: Content after modification, when diff_format=full
+            type: str
+        prepared:
+            description: Unified diff of the modification, when diff_format=unified
             type: str
 backup_file:
     description: Path to the backup file if created
     type: str
     returned: when backup=true and changed
     sample: "/var/ossec/etc/ossec.conf.12345.backup"
+results:
+    description: Per file results when I(files) is used
+    type: list
+    elements: dict
+    returned: when files is used
+    contains:
+        path:
+            description: Path of the file
+            type: str
+        changed:
+            description: Whether this file was modified
+            type: bool
+        msg:
+            description: Human readable message about what happened to this file
+            type: str
+        diff:
+            description: Differences between original and modified content of this file
+            type: dict
+        backup_file:
+            description: Path to the backup file if created
+            type: str
+xpath_cache:
+    description: Counters of the compiled XPath cache shared by all operations of the run
+    type: dict
+    returned: always
+    sample: {"hits": 37, "misses": 5, "size": 5, "maxsize": 512}
 '''
 
-import os
+import os, filecmp
 from ansible.module_utils.basic import AnsibleModule
-from ansible_collections.pyurin.utils.plugins.module_utils.wazuh.ossconf_edit import ossconf_edit
+from ansible_collections.pyurin.utils.plugins.module_utils.fileio import read_text, make_temp_file, replace_file, write_atomic, fsync_dirs, CompareWriter
+from ansible_collections.pyurin.utils.plugins.module_utils.diff import make_diff, DIFF_FORMATS, DEFAULT_MAX_DIFF_SIZE
+from ansible_collections.pyurin.utils.plugins.module_utils.resultcache import operation_digest, file_state, is_known_noop, record_noop
+from ansible_collections.pyurin.utils.plugins.module_utils.wazuh.ossconf_edit import ossconf_edit, ossconf_edit_stream, xpath_cache_info
 
-def main():
-    module_args = dict(
-        path=dict(type='path', required=True),
-        xpath=dict(type='str', required=False, default=None),
-        value=dict(type='str', required=False, default=None),
-        attributes=dict(type='dict', required=False, default=None),
-        task_block=dict(type='list', elements='dict', required=False, default=None),
-        xml_set_raw=dict(type='str', required=False, default=None),
-        when_xpath_exist=dict(type='str', required=False, default=None),
-        backup=dict(type='bool', required=False, default=False),
-    )
+def edit_file(module, path, backup, result, **edit_args):
+    """Apply ossconf_edit to a single file and return its result dict.
 
-    result = dict(
+    result is what the module reports if processing this file fails.
+    """
+    file_result = dict(
         changed=False,
     )
 
-    module = AnsibleModule(
-        argument_spec=module_args,
-        supports_check_mode=True,
-        required_one_of=[
-            ['xpath', 'task_block']
-        ]
-    )
-
-    # Get parameters
-    path = module.params['path']
-    xpath = module.params['xpath']
-    value = module.params['value']
-    attributes = module.params['attributes']
-    task_block = module.params['task_block']
-    xml_set_raw = module.params['xml_set_raw']
-    when_xpath_exist = module.params['when_xpath_exist']
-    backup = module.params['backup']
-
     # Check if file exists
     if not os.path.exists(path):
         module.fail_json(msg=f'File {path} does not exist', **result)
 
+    # Skip parsing when these operations are known to change nothing in the file as it is
+    cache_dir = module.params['cache_dir']
+    if cache_dir:
+        digest = operation_digest('ossconf_edit', **edit_args)
+        if is_known_noop(cache_dir, path, digest):
+            file_result['msg'] = 'No changes needed (cached)'
+            return file_result
+        state_before = file_state(path)
+
     # Read original content
     try:
-        with open(path, 'r') as f:
-            original_content = f.read()
+        original_content = read_text(path)
     except Exception as e:
         module.fail_json(msg=f'Failed to read file {path}: {str(e)}', **result)
 
     # Process XML
     try:
-        modified_content = ossconf_edit(
-            xml_content=original_content,
-            xpath=xpath,
-            value=value,
-            attributes=attributes,
-            task_block=task_block,
-            xml_set_raw=xml_set_raw,
-            when_xpath_exist=when_xpath_exist
-        )
+        modified_content = ossconf_edit(xml_content=original_content, **edit_args)
     except Exception as e:
-        module.fail_json(msg=f'Failed to process XML: {str(e)}', **result)
+        module.fail_json(msg=f'Failed to process XML in {path}: {str(e)}', **result)
 
     # Check if content changed
     if original_content != modified_content:
-        result['changed'] = True
-        result['diff'] = {
-            'before': original_content,
-            'after': modified_content
-        }
+        file_result['changed'] = True
+        file_result['diff'] = make_diff(original_content, modified_content, path,
+                                        module.params['diff_format'], module.params['diff_max_size'])
 
         # If not in check mode, write the file
         if not module.check_mode:
             # Create backup if requested
             if backup:
                 backup_file = module.backup_local(path)
-                result['backup_file'] = backup_file
+                file_result['backup_file'] = backup_file
+
+            # Write modified content to a temporary file and move it over the original
+            try:
+                write_atomic(module, path, modified_content, module.params['fsync'])
+                file_result['msg'] = 'XML file modified successfully'
+            except Exception as e:
+                module.fail_json(msg=f'Failed to write file {path}: {str(e)}', **result)
+        else:
+            file_result['msg'] = 'XML file would be modified (check mode)'
+    else:
+        file_result['msg'] = 'No changes needed'
+        if cache_dir and not module.check_mode:
+            record_noop(cache_dir, path, state_before, digest)
+
+    return file_result
+
+
+def stream_edit_file(module, path, backup, result, **edit_args):
+    """Apply ossconf_edit_stream to a single file and return its result dict.
+
+    The result is written to a temporary file, which replaces the original one if they differ.
+    In check mode it is only compared with the original file.
+    """
+    file_result = dict(
+        changed=False,
+    )
+
+    # Check if file exists
+    if not os.path.exists(path):
+        module.fail_json(msg=f'File {path} does not exist', **result)
+
+    # Skip parsing when these operations are known to change nothing in the file as it is
+    cache_dir = module.params['cache_dir']
+    if cache_dir:
+        digest = operation_digest('ossconf_edit', **edit_args)
+        if is_known_noop(cache_dir, path, digest):
+            file_result['msg'] = 'No changes needed (cached)'
+            return file_result
+        state_before = file_state(path)
+
+    # In check mode nothing is written, the output is only compared with the file
+    if module.check_mode:
+        try:
+            with CompareWriter(path) as destination:
+                written = ossconf_edit_stream(path, destination, **edit_args)
+        except Exception as e:
+            module.fail_json(msg=f'Failed to process XML in {path}: {str(e)}', **result)
+        if written and destination.differs:
+            file_result['changed'] = True
+            file_result['msg'] = 'XML file would be modified (check mode)'
+        else:
+            file_result['msg'] = 'No changes needed'
+        return file_result
+
+    tmp_fd, tmp_path = make_temp_file(path)
+    try:
+        # Process XML
+        try:
+            with os.fdopen(tmp_fd, 'w') as destination:
+                written = ossconf_edit_stream(path, destination, **edit_args)
+            changed = written and not filecmp.cmp(path, tmp_path, shallow=False)
+        except Exception as e:
+            module.fail_json(msg=f'Failed to process XML in {path}: {str(e)}', **result)
+
+        if changed:
+            file_result['changed'] = True
+
+            # Create backup if requested
+            if backup:
+                backup_file = module.backup_local(path)
+                file_result['backup_file'] = backup_file
 
-            # Write modified content
             try:
-                with open(path, 'w') as f:
-                    f.write(modified_content)
-                result['msg'] = 'XML file modified successfully'
+                replace_file(module, tmp_path, path, module.params['fsync'])
+                file_result['msg'] = 'XML file modified successfully'
             except Exception as e:
                 module.fail_json(msg=f'Failed to write file {path}: {str(e)}', **result)
         else:
-            result['msg'] = 'XML file would be modified (check mode)'
+            file_result['msg'] = 'No changes needed'
+            if cache_dir:
+                record_noop(cache_dir, path, state_before, digest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return file_result
+
+
+def main():
+    module_args = dict(
+        path=dict(type='path', required=False, default=None),
+        xpath=dict(type='str', required=False, default=None),
+        value=dict(type='str', required=False, default=None),
+        attributes=dict(type='dict', required=False, default=None),
+        task_block=dict(type='list', elements='dict', required=False, default=None),
+        xml_set_raw=dict(type='str', required=False, default=None),
+        when_xpath_exist=dict(type='str', required=False, default=None),
+        backup=dict(type='bool', required=False, default=False),
+        fsync=dict(type='bool', required=False, default=False),
+        diff_format=dict(type='str', required=False, default='full', choices=DIFF_FORMATS),
+        diff_max_size=dict(type='int', required=False, default=DEFAULT_MAX_DIFF_SIZE),
+        cache_dir=dict(type='path', required=False, default=None),
+        streaming=dict(type='bool', required=False, default=False),
+        files=dict(type='list', elements='dict', required=False, default=None, options=dict(
+            path=dict(type='path', required=True),
+            task_block=dict(type='list', elements='dict', required=True),
+            backup=dict(type='bool', required=False, default=None),
+        )),
+    )
+
+    result = dict(
+        changed=False,
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_one_of=[
+            ['xpath', 'task_block', 'files'],
+            ['path', 'files'],
+        ],
+        mutually_exclusive=[
+            ['path', 'files'],
+            ['xpath', 'files'],
+            ['task_block', 'files'],
+        ],
+    )
+
+    # Get parameters
+    path = module.params['path']
+    backup = module.params['backup']
+    files = module.params['files']
+    process_file = stream_edit_file if module.params['streaming'] else edit_file
+
+    if files is None:
+        result.update(process_file(
+            module,
+            path,
+            backup,
+            result,
+            xpath=module.params['xpath'],
+            value=module.params['value'],
+            attributes=module.params['attributes'],
+            task_block=module.params['task_block'],
+            xml_set_raw=module.params['xml_set_raw'],
+            when_xpath_exist=module.params['when_xpath_exist']
+        ))
     else:
-        result['msg'] = 'No changes needed'
+        # Batch mode: every file is processed in this single module run
+        result['results'] = []
+        for entry in files:
+            entry_backup = backup if entry['backup'] is None else entry['backup']
+            file_result = process_file(module, entry['path'], entry_backup, result, task_block=entry['task_block'])
+            file_result['path'] = entry['path']
+            result['results'].append(file_result)
+            if file_result['changed']:
+                result['changed'] = True
+
+        changed_results = [r for r in result['results'] if r['changed']]
+        if changed_results:
+            diffs = [
+                dict(r['diff'], before_header=r['path'], after_header=r['path'])
+                for r in changed_results if 'diff' in r
+            ]
+            if diffs:
+                result['diff'] = diffs
+            result['msg'] = f'{len(changed_results)} of {len(files)} XML files modified'
+        else:
+            result['msg'] = 'No changes needed'
+
+    # Make the renames durable, once per directory
+    if module.params['fsync'] and result['changed'] and not module.check_mode:
+        fsync_dirs([path] if files is None else [r['path'] for r in result['results'] if r['changed']])
 
+    result['xpath_cache'] = xpath_cache_info()
     module.exit_json(**result)
 
 
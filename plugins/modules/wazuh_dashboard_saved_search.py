@@ -16,6 +16,8 @@ description:
     - This module creates or updates a saved search in OpenSearch Dashboards (Wazuh Dashboard)
     - It uses the OpenSearch API to manage saved search objects
     - Automatically detects if a saved search with the same title exists and updates it
+    - A saved search whose stored attributes already match is left as it is and reported as not changed
+    - Several saved searches can be reconciled at once with I(saved_searches), using bulk API requests
 options:
     dashboard_host:
         description:
@@ -37,7 +39,8 @@ options:
         description:
             - Title for the saved search
             - Used as the display name and for identifying existing searches
-        required: true
+            - Either saved_search_title or saved_searches is required
+        required: false
         type: str
     filter:
         description:
@@ -66,6 +69,63 @@ options:
         required: false
         type: int
         default: 443
+    saved_searches:
+        description:
+            - List of saved searches to create or update, instead of a single one
+            - Existing searches are found with one request, then created and updated in bulk
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            title:
+                description:
+                    - Title for the saved search
+                required: true
+                type: str
+            filter:
+                description:
+                    - Filter string in simple format, see I(filter)
+                required: false
+                type: str
+            columns:
+                description:
+                    - List of column names to display, see I(columns)
+                required: false
+                type: list
+                elements: str
+            description:
+                description:
+                    - Description for the saved search, defaults to the title
+                required: false
+                type: str
+    chunk_size:
+        description:
+            - Number of saved searches sent in one bulk request when I(saved_searches) is used
+        required: false
+        type: int
+        default: 100
+    stable_id:
+        description:
+            - Store every saved search at an id derived from I(id_namespace) and its title, a uuid5
+            - The searches are then read by id and written with overwrite, no search by title is made
+            - Saved searches created without it keep their ids, see I(remove_duplicates)
+        required: false
+        type: bool
+        default: false
+    id_namespace:
+        description:
+            - Namespace of the ids derived from the titles when I(stable_id) is set
+            - Gives different ids to searches with the same title managed by different playbooks
+        required: false
+        type: str
+        default: ''
+    remove_duplicates:
+        description:
+            - Delete the other saved searches that have the title of a managed one, requires I(stable_id)
+            - Collapses the duplicates left by concurrent runs or by searches created without I(stable_id)
+        required: false
+        type: bool
+        default: false
 author:
     - Your Name (@yourhandle)
 '''
@@ -106,6 +166,19 @@ EXAMPLES = r'''
     filter: "agent.name:Mac-mini.local and not rule.groups:auth_failed"
     description: "Mac mini logs excluding authentication failures"
 
+# Create or update many saved searches with a few requests
+- name: Provision saved searches
+  pyurin.utils.wazuh_dashboard_saved_search:
+    dashboard_host: "192.168.1.100"
+    username: "admin"
+    password: "SecretPassword123"
+    saved_searches:
+      - title: "Mac mini Logs"
+        filter: "agent.name:Mac-mini.local"
+      - title: "Authentication Failures"
+        filter: "rule.groups:authentication_failed"
+        description: "All authentication failure events"
+
 # Create saved search on custom port
 - name: Create saved search on non-standard port
   pyurin.utils.wazuh_dashboard_saved_search:
@@ -115,11 +188,23 @@ EXAMPLES = r'''
     saved_search_title: "Custom Search"
     filter: "rule.level:10"
     port: 8443
+
+# Upsert at a stable id and delete the older copies of the same search
+- name: Provision saved searches with stable ids
+  pyurin.utils.wazuh_dashboard_saved_search:
+    dashboard_host: "192.168.1.100"
+    username: "admin"
+    password: "SecretPassword123"
+    stable_id: true
+    remove_duplicates: true
+    saved_searches:
+      - title: "Mac mini Logs"
+        filter: "agent.name:Mac-mini.local"
 '''
 
 RETURN = r'''
 changed:
-    description: Whether the saved search was created or updated
+    description: Whether a saved search was created or updated, false if they all matched already
     type: bool
     returned: always
     sample: true
@@ -136,13 +221,39 @@ saved_search_id:
 saved_search_title:
     description: Title of the saved search
     type: str
-    returned: when successful
+    returned: when successful and saved_search_title is used
     sample: "Mac mini Logs"
+duplicates:
+    description: IDs of the duplicate saved searches deleted when saved_search_title is used
+    type: list
+    elements: str
+    returned: when successful and remove_duplicates is set
+saved_searches:
+    description: Result for every saved search when I(saved_searches) is used
+    type: list
+    elements: dict
+    returned: when successful and saved_searches is used
+    contains:
+        title:
+            description: Title of the saved search
+            type: str
+        id:
+            description: ID of the saved search
+            type: str
+        action:
+            description: Whether the saved search was C(created), C(updated) or C(unchanged)
+            type: str
+        duplicates:
+            description: IDs of the duplicate saved searches deleted, when I(remove_duplicates) is set
+            type: list
+            elements: str
 '''
 
 import requests
 from ansible.module_utils.basic import AnsibleModule
-from ansible_collections.pyurin.utils.plugins.module_utils.wazuh.dashboard.create_saved_search import create_saved_search
+from ansible_collections.pyurin.utils.plugins.module_utils.wazuh.dashboard.create_saved_search import (
+    create_saved_search, create_saved_searches, upsert_saved_searches
+)
 
 def run_module():
 
@@ -150,11 +261,21 @@ def run_module():
         dashboard_host=dict(type='str', required=True),
         username=dict(type='str', required=True),
         password=dict(type='str', required=True, no_log=True),
-        saved_search_title=dict(type='str', required=True),
+        saved_search_title=dict(type='str', required=False, default=None),
         filter=dict(type='str', required=False, default=None),
         columns=dict(type='list', elements='str', required=False, default=None),
         description=dict(type='str', required=False, default=None),
         port=dict(type='int', required=False, default=443),
+        saved_searches=dict(type='list', elements='dict', required=False, default=None, options=dict(
+            title=dict(type='str', required=True),
+            filter=dict(type='str', required=False, default=None),
+            columns=dict(type='list', elements='str', required=False, default=None),
+            description=dict(type='str', required=False, default=None),
+        )),
+        chunk_size=dict(type='int', required=False, default=100),
+        stable_id=dict(type='bool', required=False, default=False),
+        id_namespace=dict(type='str', required=False, default=''),
+        remove_duplicates=dict(type='bool', required=False, default=False),
     )
 
     result = dict(
@@ -164,6 +285,8 @@ def run_module():
     module = AnsibleModule(
         argument_spec=module_args,
         supports_check_mode=False,  # API operations cannot be simulated in check mode
+        required_one_of=[['saved_search_title', 'saved_searches']],
+        mutually_exclusive=[['saved_search_title', 'saved_searches']],
     )
 
 
@@ -176,35 +299,67 @@ def run_module():
     columns = module.params['columns']
     description = module.params['description']
     port = module.params['port']
+    saved_searches = module.params['saved_searches']
 
-    # Call the create_saved_search function
-    try:
-        # Import the API functions to check if search already exists
-        from ansible_collections.pyurin.utils.plugins.module_utils.wazuh.dashboard.api import (
-            find_saved_objects
-        )
+    if module.params['remove_duplicates'] and not module.params['stable_id']:
+        module.fail_json(msg='remove_duplicates requires stable_id', **result)
 
-        # Check if saved search already exists
-        find_success, existing_objects, find_error = find_saved_objects(
-            dashboard_host=dashboard_host,
-            object_type='search',
-            search_term=saved_search_title,
-            username=username,
-            password=password,
-            port=port
-        )
+    if module.params['stable_id']:
+        single = saved_searches is None
+        if single:
+            saved_searches = [dict(title=saved_search_title, filter=filter_str, columns=columns, description=description)]
+        try:
+            results = upsert_saved_searches(
+                dashboard_host=dashboard_host,
+                username=username,
+                password=password,
+                saved_searches=saved_searches,
+                port=port,
+                chunk_size=module.params['chunk_size'],
+                id_namespace=module.params['id_namespace'],
+                remove_duplicates=module.params['remove_duplicates']
+            )
+        except Exception as e:
+            module.fail_json(msg=f'Failed to upsert saved searches: {str(e)}', **result)
+
+        result['changed'] = any(r['action'] != 'unchanged' or r.get('duplicates') for r in results)
+        if single:
+            result['saved_search_title'] = saved_search_title
+            result['saved_search_id'] = results[0]['id']
+            if module.params['remove_duplicates']:
+                result['duplicates'] = results[0]['duplicates']
+            result['msg'] = f'Saved search "{saved_search_title}" {results[0]["action"]}'
+        else:
+            result['saved_searches'] = results
+            counts = {action: sum(1 for r in results if r['action'] == action) for action in ('created', 'updated', 'unchanged')}
+            result['msg'] = ', '.join(f'{count} saved searches {action}' for action, count in counts.items())
+        if module.params['remove_duplicates']:
+            result['msg'] += f', {sum(len(r["duplicates"]) for r in results)} duplicates removed'
+        module.exit_json(**result)
 
-        existing_object_id = None
-        if find_success and existing_objects:
-            # Filter to exact title match
-            exact_matches = [obj for obj in existing_objects
-                           if obj.get('attributes', {}).get('title') == saved_search_title]
+    if saved_searches is not None:
+        try:
+            results = create_saved_searches(
+                dashboard_host=dashboard_host,
+                username=username,
+                password=password,
+                saved_searches=saved_searches,
+                port=port,
+                chunk_size=module.params['chunk_size']
+            )
+        except Exception as e:
+            module.fail_json(msg=f'Failed to create/update saved searches: {str(e)}', **result)
 
-            if exact_matches:
-                existing_object_id = exact_matches[0].get('id')
+        counts = {action: sum(1 for r in results if r['action'] == action) for action in ('created', 'updated', 'unchanged')}
+        result['changed'] = counts['created'] + counts['updated'] > 0
+        result['saved_searches'] = results
+        result['msg'] = ', '.join(f'{count} saved searches {action}' for action, count in counts.items())
+        module.exit_json(**result)
 
-        # Create or update the saved search
-        create_saved_search(
+    # Call the create_saved_search function
+    try:
+        # One lookup and at most one write, nothing is written if the search already matches
+        search_result = create_saved_search(
             dashboard_host=dashboard_host,
             username=username,
             password=password,
@@ -215,33 +370,13 @@ def run_module():
             port=port
         )
 
-        # Get the saved search ID after creation/update
-        find_success, objects_after, _ = find_saved_objects(
-            dashboard_host=dashboard_host,
-            object_type='search',
-            search_term=saved_search_title,
-            username=username,
-            password=password,
-            port=port
-        )
-
-        saved_search_id = None
-        if find_success and objects_after:
-            exact_matches = [obj for obj in objects_after
-                           if obj.get('attributes', {}).get('title') == saved_search_title]
-            if exact_matches:
-                saved_search_id = exact_matches[0].get('id')
-
-        # Determine if this was an update or create
-        if existing_object_id:
-            result['msg'] = f'Saved search "{saved_search_title}" updated successfully'
-        else:
-            result['msg'] = f'Saved search "{saved_search_title}" created successfully'
-
-        result['changed'] = True
+        result['msg'] = f'Saved search "{saved_search_title}" {search_result["action"]}'
+        if search_result['action'] != 'unchanged':
+            result['msg'] += ' successfully'
+        result['changed'] = search_result['action'] != 'unchanged'
         result['saved_search_title'] = saved_search_title
-        if saved_search_id:
-            result['saved_search_id'] = saved_search_id
+        if search_result['id']:
+            result['saved_search_id'] = search_result['id']
 
     except Exception as e:
         module.fail_json(
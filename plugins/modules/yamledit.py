@@ -17,6 +17,7 @@ description:
     - It uses a separator-delimited path to locate and modify YAML elements
     - Supports setting scalar, list, and dict values
     - Supports removing elements with state=absent
+    - Several operations can be applied to the file at once with a single parse and write
 requirements:
     - yaml
 notes:
@@ -32,7 +33,10 @@ options:
             - Path to the element in YAML file, separated by separator
             - For nested structures, use the separator to navigate (e.g., 'server.host.ip')
             - For list indices, use numbers (e.g., 'servers.0.name')
-        required: true
+            - A C(*) part matches every item of a dict or list, so one task can update every matching node (e.g., 'services.*.restart')
+            - A backslash escapes the separator, C(*) or a backslash inside a part (e.g., 'annotations.app\.kubernetes\.io/name')
+            - Either key or operations is required
+        required: false
         type: str
     separator:
         description:
@@ -63,12 +67,112 @@ options:
         required: false
         type: bool
         default: false
+    values:
+        description:
+            - List of values to append with append_unique, each one only if it is not in the list yet
+            - Appending many values this way is much faster than one task per value
+            - Requires append_unique, cannot be used with value
+        required: false
+        type: list
+        elements: raw
+    operations:
+        description:
+            - List of operations applied in order to the same document, which is loaded and written once
+            - Cannot be used with key
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            key:
+                description:
+                    - Path to the element, separated by separator
+                required: true
+                type: str
+            separator:
+                description:
+                    - Separator used in the key path, defaults to I(separator)
+                required: false
+                type: str
+            value:
+                description:
+                    - Value to set or append, ignored when state=absent
+                required: false
+                type: raw
+            values:
+                description:
+                    - List of values to append with append_unique, cannot be used with value
+                required: false
+                type: list
+                elements: raw
+            state:
+                description:
+                    - Whether to set (present) or remove (absent) the element
+                required: false
+                type: str
+                choices: ['present', 'absent']
+                default: 'present'
+            append_unique:
+                description:
+                    - Append value to the list at key if it is not already there
+                required: false
+                type: bool
+                default: false
+    document:
+        description:
+            - Edit a multi-document YAML file (documents separated by C(---)), only in the documents selected by this option
+            - Either the index of a document (negative counts from the end), or a dict of keys (paths like I(key), using I(separator)) and the values they must have
+            - The other documents are kept as they are, the task fails if no document matches
+        required: false
+        type: raw
+    max_list_gap:
+        description:
+            - Maximum number of null items added to a list when setting an index past its end
+            - A larger gap fails the task, it is usually a mistyped index (e.g. 'items.100000')
+            - Set to -1 for no limit
+        required: false
+        type: int
+        default: 100
+    round_trip:
+        description:
+            - Rewrite only the edited entries of the file, keeping comments, quoting and layout of the rest as is
+            - Edits that cannot be spliced into the original text (e.g. inside flow collections or lists) fall back to dumping the whole document
+        required: false
+        type: bool
+        default: false
+    diff_format:
+        description:
+            - How the diff of a changed file is returned
+            - C(full) returns the whole content before and after the change
+            - C(unified) returns only a unified diff, computed on the managed host, which is much smaller for big files
+        required: false
+        type: str
+        choices: ['full', 'unified']
+        default: full
+    diff_max_size:
+        description:
+            - Maximum size of a unified diff in characters, a longer one is truncated
+        required: false
+        type: int
+        default: 65536
+    cache_dir:
+        description:
+            - Directory where the operations found to change nothing in the file are recorded, with the state of the file (inode, mtime, size and sha256)
+            - A rerun of the same operations on the unchanged file returns changed=false after a stat and a hash of the file, without parsing it
+        required: false
+        type: path
     backup:
         description:
             - Create a backup file before modifying
         required: false
         type: bool
         default: false
+    fsync:
+        description:
+            - Flush the new content and the directory entry to disk when the file is replaced
+            - The file is always replaced atomically (written to a temporary file in the same directory and renamed), fsync also makes the change survive a crash
+        required: false
+        type: bool
+        default: false
 author:
     - Your Name (@yourhandle)
 '''
@@ -122,6 +226,23 @@ EXAMPLES = r'''
     key: debug
     state: absent
 
+# Set a value in every service
+- name: Restart all services automatically
+  pyurin.utils.yamledit:
+    path: /opt/wazuh-docker/docker-compose.yml
+    key: services.*.restart
+    value: always
+
+# Edit a document of a multi-document file
+- name: Scale the manager deployment
+  pyurin.utils.yamledit:
+    path: /opt/wazuh-kubernetes/manager.yml
+    key: spec.replicas
+    value: 3
+    document:
+      kind: Deployment
+      metadata.name: wazuh-manager
+
 # Use custom separator
 - name: Set value with slash separator
   pyurin.utils.yamledit:
@@ -146,6 +267,38 @@ EXAMPLES = r'''
     value: "nginx"
     append_unique: true
 
+# Append many values at once
+- name: Allow hosts
+  pyurin.utils.yamledit:
+    path: /etc/config.yml
+    key: allowed_hosts
+    values: "{{ allowed_hosts }}"
+    append_unique: true
+
+# Apply several operations with a single load and write of the file
+- name: Switch wazuh.manager from image to build
+  pyurin.utils.yamledit:
+    path: /opt/wazuh-docker/docker-compose.yml
+    separator: "#"
+    operations:
+      - key: "services#wazuh.manager#image"
+        state: absent
+      - key: "services#wazuh.manager#build"
+        value:
+          context: "."
+      - key: "services#wazuh.manager#ports"
+        value: "1514:1514"
+        append_unique: true
+
+# Keep comments and formatting of the rest of the file
+- name: Pin dashboard image
+  pyurin.utils.yamledit:
+    path: /opt/wazuh-docker/docker-compose.yml
+    separator: "#"
+    key: "services#wazuh.dashboard#image"
+    value: "wazuh/wazuh-dashboard:4.14.2"
+    round_trip: true
+
 # Create backup before editing
 - name: Set value with backup
   pyurin.utils.yamledit:
@@ -172,10 +325,13 @@ diff:
     returned: when changed
     contains:
         before:
-            description: Content before modification
+            description: Content before modification, when diff_format=full
             type: str
         after:
-            description: Content after modification
+            description: Content after modification, when diff_format=full
+            type: str
+        prepared:
+            description: Unified diff of the modification, when diff_format=unified
             type: str
 backup_file:
     description: Path to the backup file if created
@@ -186,17 +342,40 @@ backup_file:
 
 import os
 from ansible.module_utils.basic import AnsibleModule
+from ansible_collections.pyurin.utils.plugins.module_utils.fileio import read_text, write_atomic, fsync_dirs
+from ansible_collections.pyurin.utils.plugins.module_utils.diff import make_diff, DIFF_FORMATS, DEFAULT_MAX_DIFF_SIZE
+from ansible_collections.pyurin.utils.plugins.module_utils.resultcache import operation_digest, file_state, is_known_noop, record_noop
 from ansible_collections.pyurin.utils.plugins.module_utils.yamledit import yamledit
 
+# Parameters that don't change what the edit does, left out of the cache digest
+OUTPUT_PARAMS = ('path', 'diff_format', 'diff_max_size', 'cache_dir', 'backup', 'fsync')
+
+
 def main():
     module_args = dict(
         path=dict(type='path', required=True),
-        key=dict(type='str', required=True),
+        key=dict(type='str', required=False, default=None),
         separator=dict(type='str', required=False, default='.'),
         value=dict(type='raw', required=False, default=None),
         state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
         append_unique=dict(type='bool', required=False, default=False),
+        values=dict(type='list', elements='raw', required=False, default=None),
+        operations=dict(type='list', elements='dict', required=False, default=None, options=dict(
+            key=dict(type='str', required=True),
+            separator=dict(type='str', required=False, default=None),
+            value=dict(type='raw', required=False, default=None),
+            values=dict(type='list', elements='raw', required=False, default=None),
+            state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+            append_unique=dict(type='bool', required=False, default=False),
+        ), mutually_exclusive=[['value', 'values']]),
+        document=dict(type='raw', required=False, default=None),
+        max_list_gap=dict(type='int', required=False, default=100),
+        round_trip=dict(type='bool', required=False, default=False),
+        diff_format=dict(type='str', required=False, default='full', choices=DIFF_FORMATS),
+        diff_max_size=dict(type='int', required=False, default=DEFAULT_MAX_DIFF_SIZE),
+        cache_dir=dict(type='path', required=False, default=None),
         backup=dict(type='bool', required=False, default=False),
+        fsync=dict(type='bool', required=False, default=False),
     )
 
     result = dict(
@@ -206,6 +385,8 @@ def main():
     module = AnsibleModule(
         argument_spec=module_args,
         supports_check_mode=True,
+        required_one_of=[['key', 'operations']],
+        mutually_exclusive=[['key', 'operations'], ['value', 'values'], ['values', 'operations']],
     )
 
     # Get parameters
@@ -215,16 +396,30 @@ def main():
     value = module.params['value']
     state = module.params['state']
     append_unique = module.params['append_unique']
+    values = module.params['values']
+    operations = module.params['operations']
+    round_trip = module.params['round_trip']
+    max_list_gap = module.params['max_list_gap']
+    document = module.params['document']
     backup = module.params['backup']
+    fsync = module.params['fsync']
+    cache_dir = module.params['cache_dir']
 
     # Check if file exists
     if not os.path.exists(path):
         module.fail_json(msg=f'File {path} does not exist', **result)
 
+    # Skip parsing when these operations are known to change nothing in the file as it is
+    if cache_dir:
+        digest = operation_digest('yamledit', **{k: v for k, v in module.params.items() if k not in OUTPUT_PARAMS})
+        if is_known_noop(cache_dir, path, digest):
+            result['msg'] = 'No changes needed (cached)'
+            module.exit_json(**result)
+        state_before = file_state(path)
+
     # Read original content
     try:
-        with open(path, 'r') as f:
-            original_content = f.read()
+        original_content = read_text(path)
     except Exception as e:
         module.fail_json(msg=f'Failed to read file {path}: {str(e)}', **result)
 
@@ -236,18 +431,21 @@ def main():
             separator=separator,
             value=value,
             state=state,
-            append_unique=append_unique
+            append_unique=append_unique,
+            operations=operations,
+            round_trip=round_trip,
+            values=values,
+            max_list_gap=max_list_gap if max_list_gap >= 0 else None,
+            document=document
         )
     except Exception as e:
         module.fail_json(msg=f'Failed to process YAML: {str(e)}', **result)
 
-    # Check if content changed
-    if original_content != modified_content:
+    # yamledit returns the original content itself when no operation changed the document
+    if modified_content is not original_content and original_content != modified_content:
         result['changed'] = True
-        result['diff'] = {
-            'before': original_content,
-            'after': modified_content
-        }
+        result['diff'] = make_diff(original_content, modified_content, path,
+                                   module.params['diff_format'], module.params['diff_max_size'])
 
         # If not in check mode, write the file
         if not module.check_mode:
@@ -256,10 +454,11 @@ def main():
                 backup_file = module.backup_local(path)
                 result['backup_file'] = backup_file
 
-            # Write modified content
+            # Write modified content to a temporary file and move it over the original
             try:
-                with open(path, 'w') as f:
-                    f.write(modified_content)
+                write_atomic(module, path, modified_content, fsync)
+                if fsync:
+                    fsync_dirs([path])
                 result['msg'] = 'YAML file modified successfully'
             except Exception as e:
                 module.fail_json(msg=f'Failed to write file {path}: {str(e)}', **result)
@@ -267,6 +466,8 @@ def main():
             result['msg'] = 'YAML file would be modified (check mode)'
     else:
         result['msg'] = 'No changes needed'
+        if cache_dir and not module.check_mode:
+            record_noop(cache_dir, path, state_before, digest)
 
     module.exit_json(**result)
 